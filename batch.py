@@ -0,0 +1,123 @@
+"""Vectorized classification of many numbers at once.
+
+Numbers that fit in an int64 are classified with NumPy array operations
+and a segmented sieve; anything larger falls back to the scalar helpers.
+"""
+from math import isqrt
+from typing import Callable, Iterable, Iterator
+
+import numpy as np
+
+from factorization import PERFECT_NUMBERS
+from primality import SIEVE_LIMIT, _SIEVE, is_prime, small_primes
+from properties import ARMSTRONG_NUMBERS
+
+INT64_MAX = np.iinfo(np.int64).max
+MAX_DIGITS_INT64 = 19
+# Largest n the segmented sieve handles using base primes from the startup sieve.
+SEGMENTED_SIEVE_LIMIT = SIEVE_LIMIT * SIEVE_LIMIT
+# Widest [lo, hi] span sieved in one go for an arbitrary list of numbers.
+SEGMENT_SPAN = 1 << 22
+
+_SIEVE_BITS = np.unpackbits(np.frombuffer(bytes(_SIEVE), dtype=np.uint8), bitorder="little").astype(bool)
+_BASE_PRIMES = np.fromiter(small_primes(SIEVE_LIMIT + 1), dtype=np.int64)
+_PERFECT_INT64 = np.array(sorted(p for p in PERFECT_NUMBERS if p <= INT64_MAX), dtype=np.int64)
+_ARMSTRONG_INT64 = np.array(sorted(a for a in ARMSTRONG_NUMBERS if a <= INT64_MAX), dtype=np.int64)
+
+
+def digit_sums(a: np.ndarray) -> np.ndarray:
+    rest = np.abs(a)
+    sums = np.zeros(a.size, dtype=np.int64)
+    for _ in range(MAX_DIGITS_INT64):
+        sums += rest % 10
+        rest //= 10
+    return sums
+
+
+def armstrong_mask(a: np.ndarray) -> np.ndarray:
+    return np.isin(np.abs(a), _ARMSTRONG_INT64)
+
+
+def parity_mask(a: np.ndarray) -> np.ndarray:
+    """True where the number is even."""
+    return a % 2 == 0
+
+
+def perfect_mask(a: np.ndarray) -> np.ndarray:
+    return np.isin(a, _PERFECT_INT64)
+
+
+def segmented_sieve(lo: int, hi: int) -> np.ndarray:
+    """Primality of every n in [lo, hi] as a boolean array (hi <= SEGMENTED_SIEVE_LIMIT)."""
+    lo = max(lo, 0)
+    if hi < lo:
+        return np.zeros(0, dtype=bool)
+    mask = np.ones(hi - lo + 1, dtype=bool)
+    mask[: max(0, 2 - lo)] = False
+    for p in _BASE_PRIMES[: np.searchsorted(_BASE_PRIMES, isqrt(hi), side="right")]:
+        p = int(p)
+        start = max(p * p, (lo + p - 1) // p * p)
+        mask[start - lo :: p] = False
+    return mask
+
+
+def prime_mask(a: np.ndarray) -> np.ndarray:
+    result = np.zeros(a.size, dtype=bool)
+    small = (a >= 0) & (a <= SIEVE_LIMIT)
+    n = a[small]
+    result[small] = np.where(n == 2, True, (n % 2 == 1) & _SIEVE_BITS[n >> 1])
+
+    large = np.flatnonzero(a > SIEVE_LIMIT)
+    if large.size:
+        lo, hi = int(a[large].min()), int(a[large].max())
+        if hi <= SEGMENTED_SIEVE_LIMIT and hi - lo < SEGMENT_SPAN:
+            result[large] = segmented_sieve(lo, hi)[a[large] - lo]
+        else:
+            result[large] = [is_prime(int(a[i])) for i in large]
+    return result
+
+
+def _rows(a: np.ndarray, primes: np.ndarray) -> Iterator[dict]:
+    # Converting each column once is much cheaper than indexing NumPy scalars.
+    columns = zip(
+        a.tolist(),
+        primes.tolist(),
+        perfect_mask(a).tolist(),
+        armstrong_mask(a).tolist(),
+        parity_mask(a).tolist(),
+        digit_sums(a).tolist(),
+    )
+    for n, prime, perfect, armstrong, even, digit_sum in columns:
+        properties = ["armstrong"] if armstrong else []
+        properties.append("even" if even else "odd")
+        yield {
+            "number": n,
+            "is_prime": prime,
+            "is_prime_probabilistic": False,
+            "is_perfect": perfect,
+            "properties": properties,
+            "digit_sum": digit_sum,
+        }
+
+
+def classify_numbers(numbers: Iterable[int], fallback: Callable[[int], dict]) -> Iterator[dict]:
+    """Classify a chunk of numbers, vectorizing when all of them fit in an int64.
+
+    ``fallback`` classifies a single number and is used for larger inputs.
+    """
+    numbers = list(numbers)
+    if all(-INT64_MAX <= n <= INT64_MAX for n in numbers):
+        a = np.array(numbers, dtype=np.int64)
+        yield from _rows(a, prime_mask(a))
+    else:
+        yield from map(fallback, numbers)
+
+
+def classify_range(start: int, end: int) -> Iterator[dict]:
+    """Classify every n in [start, end]; the caller keeps both ends within int64."""
+    a = np.arange(start, end + 1, dtype=np.int64)
+    if start >= 0 and end <= SEGMENTED_SIEVE_LIMIT:
+        primes = segmented_sieve(start, end)
+    else:
+        primes = prime_mask(a)
+    yield from _rows(a, primes)
@@ -0,0 +1,269 @@
+"""Benchmarks for the classifiers and the classify endpoint.
+
+    python bench.py classifiers            # per-classifier cost by magnitude band, with
+                                           # the old trial-division is_prime as "before"
+    python bench.py encoding               # per-response JSON encoding cost
+    python bench.py load                   # in-process load test against the stub upstream
+    python bench.py load --save-baseline   # record the results as the new baseline
+
+Like timeit, each timing repeats a pass over the samples long enough to
+measure, after a warm-up, and reports the median of --repeats passes; load
+metrics are the median of --repeats runs. Results are compared with the
+baseline file (bench_baseline.json by default), suspected regressions are
+measured a second time, and the command exits with status 1 when a metric
+regressed by more than --threshold in both measurements. Metrics ending
+in ``_rps`` are better when higher; all others are timings, which are
+better when lower.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Iterable, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+import httpx
+import orjson
+
+import factorization
+from facts import TTLCache
+import main
+import numbers_stub
+from properties import REGISTRY, evaluate, plan
+
+BASELINE_PATH = "bench_baseline.json"
+CLASSIFIERS = ("is_prime", "is_perfect", "is_armstrong", "digit_sum", "divisor_info")
+BANDS = range(0, 19)  # numbers in [10**k, 10**(k + 1))
+BEFORE_BANDS = range(0, 13)  # trial division is too slow to sample beyond this
+MIN_PASS_NS = 20_000_000  # shorter passes are dominated by timer and scheduling noise
+
+
+def trial_division_is_prime(n: int) -> bool:
+    """The original is_prime, kept as the "before" column of the classifiers suite."""
+    if n < 2:
+        return False
+    for i in range(2, int(n ** 0.5) + 1):
+        if n % i == 0:
+            return False
+    return True
+
+
+def _timed_pass(fn: Callable, inputs: list, loops: int) -> int:
+    elapsed = 0
+    # As in timeit, collections would otherwise land in whichever pass
+    # happens to cross the threshold.
+    gc.disable()
+    try:
+        for _ in range(loops):
+            # Factorizations are memoized; every pass must do the real work.
+            factorization._factorize.cache_clear()
+            start = time.perf_counter_ns()
+            for x in inputs:
+                fn(x)
+            elapsed += time.perf_counter_ns() - start
+    finally:
+        gc.enable()
+    return elapsed
+
+
+def measure(cases: dict[str, tuple[Callable, Iterable]], repeats: int) -> dict[str, float]:
+    """Median time per call of each ``name: (fn, inputs)`` case, in nanoseconds.
+
+    Passes of all cases are interleaved, so a burst of noise from elsewhere
+    on the machine slows one pass of many cases rather than every pass of one.
+    """
+    cases = {name: (fn, list(inputs)) for name, (fn, inputs) in cases.items()}
+    loops = {}
+    for name, (fn, inputs) in cases.items():
+        # Calibrating the loop count doubles as the warm-up.
+        loops[name] = 1
+        while _timed_pass(fn, inputs, loops[name]) < MIN_PASS_NS:
+            loops[name] *= 2
+    passes = {name: [] for name in cases}
+    for _ in range(repeats):
+        for name, (fn, inputs) in cases.items():
+            passes[name].append(_timed_pass(fn, inputs, loops[name]))
+    return {name: statistics.median(passes[name]) / (loops[name] * len(cases[name][1])) for name in cases}
+
+
+def only(cases: dict, names: Optional[set]) -> dict:
+    return cases if names is None else {name: case for name, case in cases.items() if name in names}
+
+
+def bench_classifiers(samples: int, seed: int, repeats: int, names: Optional[set] = None) -> dict[str, float]:
+    rng = random.Random(seed)
+    cases = {}
+    for k in BANDS:
+        numbers = [rng.randrange(10 ** k, 10 ** (k + 1)) for _ in range(samples)]
+        for name in CLASSIFIERS:
+            cases[f"{name}_1e{k}_ns"] = (REGISTRY[name].fn, numbers)
+        if k in BEFORE_BANDS:
+            cases[f"is_prime_before_1e{k}_ns"] = (trial_division_is_prime, numbers)
+    return measure(only(cases, names), repeats)
+
+
+def print_speedups(metrics: dict[str, float]) -> None:
+    for k in BEFORE_BANDS:
+        before, after = metrics[f"is_prime_before_1e{k}_ns"], metrics[f"is_prime_1e{k}_ns"]
+        print(f"is_prime speedup 1e{k:<2} {before / after:17.1f}x")
+
+
+def bench_encoding(samples: int, seed: int, repeats: int, names: Optional[set] = None) -> dict[str, float]:
+    """Cost of turning one classify response into bytes, per encoding path."""
+    rng = random.Random(seed)
+    fields = [f for f in main.FIELDS if f != "fun_fact"]
+    responses = []
+    for _ in range(samples):
+        n = rng.randrange(1, 10 ** 6)
+        values = evaluate(n, plan(fields))
+        responses.append({"number": n, **{f: values[f] for f in fields}, "fun_fact": numbers_stub.fact(n)})
+    cache = TTLCache(samples, ttl=3600, stale_ttl=0)
+    for r in responses:
+        cache.put((r["number"], tuple(fields)), orjson.dumps(r))
+
+    paths = {
+        # What FastAPI does for a returned dict without a response class.
+        "encode_default_json_ns": lambda r: JSONResponse(jsonable_encoder(r)).body,
+        "encode_orjson_ns": orjson.dumps,
+        "encode_cached_ns": lambda r: cache.get((r["number"], tuple(fields)))[0],
+    }
+    return measure(only({name: (encode, responses) for name, encode in paths.items()}, names), repeats)
+
+
+def request_mix(count: int, seed: int) -> list[str]:
+    """Query values shaped like production traffic: mostly small, popular numbers."""
+    rng = random.Random(seed)
+    popular = [str(n) for n in range(1000)]
+    numbers = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.6:
+            # Zipf-like skew towards the first few hundred numbers.
+            numbers.append(popular[min(int(rng.paretovariate(1.2)) - 1, 999)])
+        elif roll < 0.85:
+            numbers.append(str(int(10 ** rng.uniform(3, 9))))
+        elif roll < 0.97:
+            numbers.append(str(int(10 ** rng.uniform(9, 18))))
+        else:
+            numbers.append(rng.choice(["abc", "12.5", "-", ""]))
+    return numbers
+
+
+async def load_run(requests: int, concurrency: int, upstream_latency: float, seed: int) -> dict[str, float]:
+    numbers_stub.STUB_LATENCY = upstream_latency
+    main.UPSTREAM_TRANSPORT = httpx.ASGITransport(app=numbers_stub.app)
+    queue = request_mix(requests, seed)
+    latencies = []
+
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+            async def worker():
+                while queue:
+                    number = queue.pop()
+                    start = time.perf_counter()
+                    response = await client.get("/api/classify-number", params={"number": number})
+                    response.read()
+                    latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - start
+
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {
+        "load_throughput_rps": len(latencies) / elapsed,
+        "load_p50_ms": percentiles[49] * 1000,
+        "load_p95_ms": percentiles[94] * 1000,
+        "load_p99_ms": percentiles[98] * 1000,
+    }
+
+
+def bench_load(requests: int, concurrency: int, upstream_latency: float, seed: int, repeats: int) -> dict[str, float]:
+    """Median of each metric over ``repeats`` independent runs."""
+    runs = [asyncio.run(load_run(requests, concurrency, upstream_latency, seed)) for _ in range(repeats)]
+    return {name: statistics.median(run[name] for run in runs) for name in runs[0]}
+
+
+def best(name: str, *values: float) -> float:
+    return max(values) if name.endswith("_rps") else min(values)
+
+
+def compare(metrics: dict[str, float], baseline: dict[str, float], threshold: float) -> dict[str, str]:
+    """Regressed metric names, each with a description of the change."""
+    regressions = {}
+    for name, value in metrics.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        change = (base - value) / base if name.endswith("_rps") else (value - base) / base
+        if change > threshold:
+            regressions[name] = f"{name}: {base:.4g} -> {value:.4g} ({change:+.0%} worse)"
+    return regressions
+
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("suite", choices=["classifiers", "encoding", "load"])
+    parser.add_argument("--samples", type=int, default=200, help="numbers per magnitude band or responses to encode")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--upstream-latency", type=float, default=0.005, help="stub response delay in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=5, help="timed passes, or load runs, per metric")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    # Reruns of the same tree on a shared single-core machine differ by up to
+    # ~40% for the sub-microsecond classifiers; 0.5 keeps those quiet while
+    # still catching the order-of-magnitude changes the suites exist for.
+    parser.add_argument("--threshold", type=float, default=0.5, help="allowed relative regression")
+    args = parser.parse_args(argv)
+
+    def run(names: Optional[set] = None) -> dict[str, float]:
+        if args.suite == "classifiers":
+            return bench_classifiers(args.samples, args.seed, args.repeats, names)
+        if args.suite == "encoding":
+            return bench_encoding(args.samples, args.seed, args.repeats, names)
+        return bench_load(args.requests, args.concurrency, args.upstream_latency, args.seed, args.repeats)
+
+    metrics = run()
+    for name, value in metrics.items():
+        print(f"{name:32} {value:14.2f}")
+    if args.suite == "classifiers":
+        print_speedups(metrics)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    if args.save_baseline:
+        # Suites share one file, so only this suite's metrics are replaced.
+        baseline.update(metrics)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    regressions = compare(metrics, baseline, args.threshold)
+    if regressions:
+        # The machine's speed drifts by several percent over a run, and a
+        # stretch of noise can slow every pass of a metric. Noise rarely
+        # repeats itself in a second measurement; a real regression does.
+        print(f"Measuring {len(regressions)} suspected regressions again", file=sys.stderr)
+        retry = run(set(regressions))
+        regressions = compare({name: best(name, metrics[name], retry[name]) for name in regressions}, baseline, args.threshold)
+    for line in regressions.values():
+        print(f"REGRESSION {line}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,145 @@
+"""Off-loop evaluation of CPU-heavy number properties.
+
+Small numbers are classified inline, since doing so is cheaper than a round
+trip to another process. Larger ones are evaluated in a ProcessPoolExecutor,
+one task per property. Each property has its own time budget, the pool's
+timeout unless the caller gives it another one, and properties that have
+not finished within their budget are reported as ``TIMEOUT``. Admission is bounded, so a
+burst of expensive numbers waits for pool capacity rather than piling up
+behind the workers, and never delays the inline path for small numbers.
+If a worker process dies, the executor is replaced and the properties it
+was running are reported as ``TIMEOUT``.
+"""
+import asyncio
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import time
+from typing import Any, Callable, Optional
+
+from metrics import CLASSIFIER_SECONDS
+
+TIMEOUT = "timeout"
+
+
+class ClassificationPool:
+    def __init__(self, workers: int, timeout: float, inline_limit: int, max_admitted: int):
+        self.workers = workers
+        self.timeout = timeout
+        self.inline_limit = inline_limit
+        self.max_admitted = max_admitted
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.in_flight = 0  # property tasks submitted to the pool and not yet finished
+        self.admitted = 0  # requests holding a pool slot
+        self.waiting = 0  # requests waiting for a pool slot
+        self.rejected = 0  # requests that timed out before being admitted
+        self._slots = asyncio.Semaphore(max_admitted)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queue_depth": max(0, self.in_flight - self.workers) + self.waiting,
+            "saturation": min(1.0, self.in_flight / self.workers),
+            "admitted": self.admitted,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
+
+    def _replace_broken(self, executor: ProcessPoolExecutor) -> None:
+        # Every task of a broken executor fails, so only the first caller to
+        # notice replaces it.
+        if self.executor is executor:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        # Running tasks are bounded by their own work budgets, so waiting is
+        # short, and it avoids the executor's exit hook racing a torn-down pool.
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    async def evaluate(
+        self,
+        n: int,
+        properties: dict[str, Callable[[int], Any]],
+        budgets: Optional[dict[str, float]] = None,
+    ) -> dict[str, Any]:
+        """Evaluate each of ``properties`` on ``n``, returning TIMEOUT for the ones that miss their budget.
+
+        ``budgets`` maps property names to seconds; the rest get the pool's timeout.
+        """
+        if not properties:
+            return {}
+        if abs(n) < self.inline_limit:
+            results = {}
+            for name, fn in properties.items():
+                start = time.perf_counter()
+                results[name] = fn(n)
+                CLASSIFIER_SECONDS.observe(time.perf_counter() - start, name)
+            return results
+
+        loop = asyncio.get_running_loop()
+        budgets = budgets or {}
+        start = loop.time()
+        deadlines = {name: start + budgets.get(name, self.timeout) for name in properties}
+        results = dict.fromkeys(properties, TIMEOUT)
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), max(deadlines.values()) - start)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return results
+        finally:
+            self.waiting -= 1
+        self.admitted += 1
+
+        submitted = time.perf_counter()
+        executor = self.executor
+        futures = {}
+        try:
+            for name, fn in properties.items():
+                futures[executor.submit(fn, n)] = name
+        except BrokenProcessPool:
+            self._replace_broken(executor)
+        if not futures:
+            self.admitted -= 1
+            self._slots.release()
+            return results
+        self.in_flight += len(futures)
+        remaining = len(futures)
+
+        def finished(future: Future) -> None:
+            nonlocal remaining
+            if not future.cancelled():
+                # Includes time queued for a worker, which is what callers wait on.
+                CLASSIFIER_SECONDS.observe(time.perf_counter() - submitted, futures[future])
+            self.in_flight -= 1
+            remaining -= 1
+            # The slot is held until the workers are actually free again,
+            # not just until this request stops waiting for them.
+            if remaining == 0:
+                self.admitted -= 1
+                self._slots.release()
+
+        def schedule(f: Future) -> None:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(finished, f)
+
+        for future in futures:
+            future.add_done_callback(schedule)
+
+        async def wait(future: Future, name: str) -> None:
+            try:
+                results[name] = await asyncio.wait_for(
+                    asyncio.wrap_future(future, loop=loop), max(0.0, deadlines[name] - loop.time())
+                )
+            except asyncio.TimeoutError:
+                pass
+            except BrokenProcessPool:
+                self._replace_broken(executor)
+
+        await asyncio.gather(*(wait(f, name) for f, name in futures.items()))
+        for future in futures:
+            if not future.done():
+                future.cancel()
+        return results
@@ -0,0 +1,226 @@
+"""Offline, memory-mapped store of fun facts.
+
+The file holds a header, a sorted int64 index of numbers, a uint64 offsets
+array (one more entry than the index) and a single UTF-8 blob of facts:
+
+    b"NFS1" | 4 padding bytes | count: uint64 | numbers[count] | offsets[count + 1] | blob
+
+Workers map the file read-only, so the pages are shared between processes,
+and look facts up by binary search. New facts are buffered in memory and
+merged into a fresh file that atomically replaces the old one. Reloads run
+in a thread while lookups continue on the event loop, so the arrays of a
+mapping are always published together as one snapshot.
+
+Build or refresh a store in bulk with::
+
+    python fact_store.py build facts.bin --start 0 --end 10000
+    python fact_store.py refresh facts.bin --start 0 --end 100 --url http://127.0.0.1:9000/
+"""
+import argparse
+import asyncio
+import fcntl
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from typing import Iterable, Optional
+
+import httpx
+import numpy as np
+
+MAGIC = b"NFS1"
+HEADER = struct.Struct("<4s4xQ")  # padded so the arrays start 8-byte aligned
+INT64_MIN, INT64_MAX = np.iinfo(np.int64).min, np.iinfo(np.int64).max
+UPSTREAM_BATCH_SIZE = 100  # numbersapi.com answers at most 100 numbers per range query
+
+
+class FactStore:
+    def __init__(self, path: str, max_pending: int = 100_000):
+        self.path = path
+        # Bounds memory while flushes keep failing; facts past it are dropped
+        # and simply fetched again later.
+        self.max_pending = max_pending
+        self.pending: dict[int, str] = {}
+        self._pending_lock = threading.Lock()
+        # (numbers, offsets, blob) of the current mapping.
+        self._snapshot: tuple[np.ndarray, np.ndarray, memoryview] = (
+            np.zeros(0, dtype=np.int64),
+            np.zeros(1, dtype=np.uint64),
+            memoryview(b""),
+        )
+        self._stat: Optional[tuple[int, int]] = None
+        self.reload()
+
+    def __len__(self) -> int:
+        return len(self._snapshot[0])
+
+    def reload(self) -> bool:
+        """Map the file again if it was replaced since the last load."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        if (st.st_ino, st.st_mtime_ns) == self._stat:
+            return False
+        with open(self.path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count = HEADER.unpack_from(mapped)
+        if magic != MAGIC:
+            mapped.close()
+            raise ValueError(f"{self.path} is not a fact store")
+        offset = HEADER.size
+        numbers = np.frombuffer(mapped, dtype="<i8", count=count, offset=offset)
+        offset += 8 * count
+        offsets = np.frombuffer(mapped, dtype="<u8", count=count + 1, offset=offset)
+        offset += 8 * (count + 1)
+        # The previous map is left to the garbage collector, since readers
+        # may still hold its snapshot.
+        self._snapshot = (numbers, offsets, memoryview(mapped)[offset:])
+        self._stat = (st.st_ino, st.st_mtime_ns)
+        return True
+
+    def get(self, n: int) -> Optional[str]:
+        if not INT64_MIN <= n <= INT64_MAX:
+            return None
+        numbers, offsets, blob = self._snapshot
+        i = int(np.searchsorted(numbers, n))
+        if i < len(numbers) and numbers[i] == n:
+            return bytes(blob[offsets[i] : offsets[i + 1]]).decode()
+        return self.pending.get(n)
+
+    def items(self):
+        numbers, offsets, blob = self._snapshot
+        for i, n in enumerate(numbers.tolist()):
+            yield n, bytes(blob[offsets[i] : offsets[i + 1]]).decode()
+
+    def record(self, n: int, fact: str) -> None:
+        """Buffer a newly fetched fact until the next ``flush``."""
+        if INT64_MIN <= n <= INT64_MAX:
+            with self._pending_lock:
+                if n in self.pending or len(self.pending) < self.max_pending:
+                    self.pending[n] = fact
+
+    def flush(self) -> int:
+        """Merge pending facts into the file and remap it; returns how many were added."""
+        with self._pending_lock:
+            pending = dict(self.pending)
+        if not pending:
+            return 0
+        # Workers share the file, so merges are serialized on a lock file and
+        # start from whatever another worker last wrote.
+        with open(self.path + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self.reload()
+            merge(self.path, self._snapshot, pending)
+        self.reload()
+        # Only now that the facts can be read back from the file are they
+        # dropped from the buffer, and only if no newer fact replaced them.
+        with self._pending_lock:
+            for n, fact in pending.items():
+                if self.pending.get(n) is fact:
+                    del self.pending[n]
+        return len(pending)
+
+
+def _write_file(path: str, numbers: np.ndarray, lengths: np.ndarray, chunks: Iterable) -> None:
+    # ``chunks`` are the fact bytes in index order, in pieces of any size.
+    offsets = np.zeros(len(numbers) + 1, dtype="<u8")
+    np.cumsum(lengths, out=offsets[1:])
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, len(numbers)))
+            f.write(numbers.astype("<i8").tobytes())
+            f.write(offsets.tobytes())
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def write(path: str, facts: dict[int, str]) -> None:
+    """Write ``facts`` as a store at ``path``, atomically replacing any existing file."""
+    numbers = np.array(sorted(facts), dtype="<i8")
+    encoded = [facts[n].encode() for n in numbers.tolist()]
+    _write_file(path, numbers, np.array([len(e) for e in encoded], dtype="<u8"), encoded)
+
+
+def merge(path: str, snapshot: tuple[np.ndarray, np.ndarray, memoryview], facts: dict[int, str]) -> None:
+    """Write the store in ``snapshot`` with ``facts`` added or replaced to ``path``.
+
+    Only the new facts are encoded; existing ones are copied as raw slices of
+    the blob between the points where new facts go in, so a flush costs
+    O(len(facts)) Python work however large the store is.
+    """
+    numbers, offsets, blob = snapshot
+    added = np.array(sorted(facts), dtype=np.int64)
+    encoded = [facts[n].encode() for n in added.tolist()]
+
+    added_lengths = np.array([len(e) for e in encoded], dtype=np.uint64)
+
+    positions = np.searchsorted(numbers, added)
+    replaced = positions < len(numbers)
+    replaced[replaced] = numbers[positions[replaced]] == added[replaced]
+    lengths = np.diff(offsets)
+    lengths[positions[replaced]] = added_lengths[replaced]
+    # Inserting at sorted positions keeps the index sorted.
+    inserted = ~replaced
+    merged = np.insert(numbers, positions[inserted], added[inserted])
+    lengths = np.insert(lengths, positions[inserted], added_lengths[inserted])
+
+    def chunks():
+        cursor = 0  # index of the next existing fact to copy
+        for position, is_replaced, e in zip(positions.tolist(), replaced.tolist(), encoded):
+            yield blob[int(offsets[cursor]) : int(offsets[position])]
+            yield e
+            cursor = position + is_replaced
+        yield blob[int(offsets[cursor]) :]
+
+    _write_file(path, merged, lengths, chunks())
+
+
+async def fetch_range(client: httpx.AsyncClient, start: int, end: int) -> dict[int, str]:
+    response = await client.get(f"{start}..{end}/math")
+    response.raise_for_status()
+    return {int(n): fact for n, fact in response.json().items()}
+
+
+async def fetch_all(url: str, start: int, end: int, concurrency: int) -> dict[int, str]:
+    semaphore = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=30.0) as client:
+
+        async def fetch(lo: int) -> dict[int, str]:
+            async with semaphore:
+                return await fetch_range(client, lo, min(lo + UPSTREAM_BATCH_SIZE - 1, end))
+
+        batches = await asyncio.gather(*(fetch(lo) for lo in range(start, end + 1, UPSTREAM_BATCH_SIZE)))
+    return {n: fact for batch in batches for n, fact in batch.items()}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Build or refresh an offline fun-fact store.")
+    parser.add_argument("command", choices=["build", "refresh"], help="build replaces the store, refresh merges into it")
+    parser.add_argument("path", help="store file to write")
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--end", type=int, default=1000, help="last number to fetch (inclusive)")
+    parser.add_argument("--url", default=os.environ.get("NUMBERS_API_URL", "http://numbersapi.com/"))
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    fetched = asyncio.run(fetch_all(args.url, args.start, args.end, args.concurrency))
+    if args.command == "refresh" and os.path.exists(args.path):
+        store = FactStore(args.path)
+        store.pending.update(fetched)
+        store.flush()
+        total = len(store)
+    else:
+        write(args.path, fetched)
+        total = len(fetched)
+    print(f"Fetched {len(fetched)} facts; {args.path} now holds {total}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Integer factorization and divisor-sum helpers.
+
+Factors are found by trial division over a small-prime wheel followed by
+Brent's variant of Pollard's rho; results are memoized per number.
+"""
+from functools import lru_cache
+from math import gcd, prod
+import os
+import random
+
+from primality import is_prime, small_primes
+
+WHEEL_PRIMES = tuple(small_primes(1000))
+RHO_MAX_ITERATIONS = int(os.environ.get("RHO_MAX_ITERATIONS", 1_000_000))
+
+# Exponents p of every Mersenne prime 2**p - 1 below 2**2203. By Euclid-Euler
+# every even perfect number below PERFECT_NUMBERS_BOUND is therefore listed.
+MERSENNE_EXPONENTS = (2, 3, 5, 7, 13, 17, 19, 31, 61, 89, 107, 127, 521, 607, 1279)
+PERFECT_NUMBERS = frozenset((1 << (p - 1)) * ((1 << p) - 1) for p in MERSENNE_EXPONENTS)
+# Odd perfect numbers are ruled out below 10**1500, which is above this bound.
+PERFECT_NUMBERS_BOUND = (1 << 2202) * ((1 << 2203) - 1)
+
+
+class FactorizationIncomplete(Exception):
+    """Raised when Pollard's rho exhausts its iteration budget."""
+
+
+def _brent_rho(n: int, budget: int) -> int:
+    if n % 2 == 0:
+        return 2
+    while True:
+        y, c, m = random.randrange(1, n), random.randrange(1, n), 128
+        g = r = q = 1
+        while g == 1:
+            x = y
+            for _ in range(r):
+                y = (y * y + c) % n
+            k = 0
+            while k < r and g == 1:
+                ys = y
+                for _ in range(min(m, r - k)):
+                    y = (y * y + c) % n
+                    q = q * abs(x - y) % n
+                g = gcd(q, n)
+                k += m
+            r *= 2
+            budget -= r
+            if budget <= 0 and g == 1:
+                raise FactorizationIncomplete(n)
+        if g == n:
+            while True:
+                ys = (ys * ys + c) % n
+                g = gcd(abs(x - ys), n)
+                if g > 1:
+                    break
+        if g != n:
+            return g
+
+
+def _factor_large(n: int, factors: dict[int, int]) -> None:
+    stack = [n]
+    while stack:
+        m = stack.pop()
+        if m == 1:
+            continue
+        if is_prime(m):
+            factors[m] = factors.get(m, 0) + 1
+            continue
+        d = _brent_rho(m, RHO_MAX_ITERATIONS)
+        stack.extend((d, m // d))
+
+
+@lru_cache(maxsize=4096)
+def _factorize(n: int) -> tuple[tuple[int, int], ...]:
+    factors: dict[int, int] = {}
+    for p in WHEEL_PRIMES:
+        if p * p > n:
+            break
+        while n % p == 0:
+            factors[p] = factors.get(p, 0) + 1
+            n //= p
+    if n > 1:
+        _factor_large(n, factors)
+    return tuple(sorted(factors.items()))
+
+
+def factorize(n: int) -> dict[int, int]:
+    """Return the prime factorization of ``n >= 1`` as ``{prime: exponent}``.
+
+    Raises FactorizationIncomplete if a factor could not be split within
+    RHO_MAX_ITERATIONS.
+    """
+    if n < 1:
+        raise ValueError("factorize() requires a positive integer")
+    return dict(_factorize(n))
+
+
+def prime_factors(n: int) -> list[int]:
+    return [p for p, e in factorize(n).items() for _ in range(e)]
+
+
+def divisor_count(n: int) -> int:
+    return prod(e + 1 for e in factorize(n).values())
+
+
+def sigma(n: int) -> int:
+    """Sum of all positive divisors of ``n``."""
+    return prod((p ** (e + 1) - 1) // (p - 1) for p, e in factorize(n).items())
+
+
+def is_perfect(n: int) -> bool:
+    if n < 1:
+        return False
+    if n in PERFECT_NUMBERS:
+        return True
+    if n < PERFECT_NUMBERS_BOUND:
+        return False
+    return sigma(n) == 2 * n
+
+
+def abundance(n: int) -> str:
+    """Classify ``n >= 1`` as "perfect", "abundant" or "deficient"."""
+    if is_perfect(n):
+        return "perfect"
+    return "abundant" if sigma(n) > 2 * n else "deficient"
+
+
+def divisor_info(n: int) -> dict:
+    """Prime factors, divisor count and abundance of ``n``.
+
+    The fields are None for n < 1 and when the factorization does not finish
+    within its budget.
+    """
+    if n >= 1:
+        try:
+            return {
+                "prime_factors": prime_factors(n),
+                "divisor_count": divisor_count(n),
+                "abundance": abundance(n),
+            }
+        except FactorizationIncomplete:
+            pass
+    return {"prime_factors": None, "divisor_count": None, "abundance": None}
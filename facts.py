@@ -0,0 +1,180 @@
+"""Fun-fact lookups against the upstream numbers API.
+
+A single pooled ``httpx.AsyncClient`` is shared by every request. Facts are
+kept in a bounded LRU cache with a TTL and served stale while a background
+refresh runs, and concurrent lookups of the same number share one upstream
+call. An optional offline ``FactStore`` is consulted before going upstream
+and collects every newly fetched fact.
+
+Batch requests go through ``get_many`` instead, which fetches facts with
+range queries and leaves both the cache and the store untouched, so a large
+batch cannot push out the facts single lookups depend on.
+"""
+import asyncio
+from collections import OrderedDict
+import time
+from typing import Any, Hashable, Iterable, Optional
+
+import httpx
+
+from fact_store import UPSTREAM_BATCH_SIZE, FactStore, fetch_range
+from metrics import FACT_LOOKUPS, UPSTREAM_REQUESTS, UPSTREAM_SECONDS, record
+
+NO_FACT = "No fact available"
+
+
+class TTLCache:
+    """Bounded LRU of values, each stamped with the time it was stored."""
+
+    def __init__(self, maxsize: int, ttl: float, stale_ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> tuple[Optional[Any], bool]:
+        """Return ``(value, fresh)``; ``value`` is None on a miss or once fully expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, False
+        value, stored_at = entry
+        age = time.monotonic() - stored_at
+        if age > self.ttl + self.stale_ttl:
+            del self._entries[key]
+            return None, False
+        self._entries.move_to_end(key)
+        return value, age <= self.ttl
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+class FactClient:
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        timeout: float = 2.0,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        cache_size: int = 10_000,
+        cache_ttl: float = 86_400.0,
+        cache_stale_ttl: float = 3_600.0,
+        store: Optional[FactStore] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        range_concurrency: int = 16,
+    ):
+        self.timeout = timeout
+        self.store = store
+        self.cache = TTLCache(cache_size, cache_ttl, cache_stale_ttl)
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+            transport=transport,
+        )
+        self._inflight: dict[int, asyncio.Task] = {}
+        # Shared by every batch request, so together they cannot flood upstream.
+        self._range_slots = asyncio.Semaphore(range_concurrency)
+
+    async def aclose(self) -> None:
+        for task in list(self._inflight.values()):
+            task.cancel()
+        await self._client.aclose()
+
+    async def _fetch(self, n: int) -> Optional[str]:
+        start = time.perf_counter()
+        try:
+            response = await self._client.get(f"{n}/math")
+            response.raise_for_status()
+        except httpx.TimeoutException:
+            UPSTREAM_REQUESTS.inc("timeout")
+            return None
+        except httpx.HTTPError:
+            UPSTREAM_REQUESTS.inc("error")
+            return None
+        finally:
+            elapsed = time.perf_counter() - start
+            UPSTREAM_SECONDS.observe(elapsed)
+            # The fetch task runs in a copy of the request's context, so this
+            # lands in the Server-Timing of the request that started it.
+            record("upstream", elapsed)
+        UPSTREAM_REQUESTS.inc("success")
+        self.cache.put(n, response.text)
+        if self.store is not None:
+            self.store.record(n, response.text)
+        return response.text
+
+    def _fetch_once(self, n: int) -> asyncio.Task:
+        # Single flight: callers that arrive while a fetch is running share it.
+        task = self._inflight.get(n)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(n))
+            self._inflight[n] = task
+            task.add_done_callback(lambda _: self._inflight.pop(n, None))
+        return task
+
+    async def _fetch_range(self, start: int, end: int) -> dict[int, str]:
+        async with self._range_slots:
+            started = time.perf_counter()
+            try:
+                facts = await fetch_range(self._client, start, end)
+            except httpx.TimeoutException:
+                UPSTREAM_REQUESTS.inc("timeout")
+                return {}
+            except (httpx.HTTPError, ValueError):
+                UPSTREAM_REQUESTS.inc("error")
+                return {}
+            finally:
+                UPSTREAM_SECONDS.observe(time.perf_counter() - started)
+        UPSTREAM_REQUESTS.inc("success")
+        return facts
+
+    async def get_many(self, numbers: Iterable[int]) -> dict[int, str]:
+        """Facts for a batch of numbers; numbers without one are left out."""
+        wanted = set(numbers)
+        facts = {}
+        runs: list[list[int]] = []  # [start, end] of each range query
+        for n in sorted(wanted):
+            fact = self.store.get(n) if self.store is not None else None
+            if fact is not None:
+                facts[n] = fact
+            elif runs and n - runs[-1][0] < UPSTREAM_BATCH_SIZE:
+                runs[-1][1] = n
+            else:
+                runs.append([n, n])
+        for fetched in await asyncio.gather(*(self._fetch_range(start, end) for start, end in runs)):
+            # Range queries also answer for the gaps between wanted numbers.
+            facts.update((n, fact) for n, fact in fetched.items() if n in wanted)
+        return facts
+
+    async def get(self, n: int) -> str:
+        fact, fresh = self.cache.get(n)
+        if fact is not None:
+            FACT_LOOKUPS.inc("cache" if fresh else "stale")
+            if not fresh:
+                self._fetch_once(n)
+            return fact
+        if self.store is not None:
+            fact = self.store.get(n)
+            if fact is not None:
+                FACT_LOOKUPS.inc("store")
+                return fact
+        try:
+            # Shielded so one caller hitting its deadline does not cancel the
+            # fetch for everyone else waiting on it.
+            fact = await asyncio.wait_for(asyncio.shield(self._fetch_once(n)), self.timeout)
+        except asyncio.TimeoutError:
+            FACT_LOOKUPS.inc("deadline")
+            return NO_FACT
+        FACT_LOOKUPS.inc("upstream")
+        return fact if fact is not None else NO_FACT
@@ -1,9 +1,135 @@
-from fastapi import FastAPI, HTTPException, Query
+from contextlib import asynccontextmanager
+from fastapi import Body, FastAPI, Query, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.exceptions import HTTPException
+import asyncio
 import httpx
+import json
+import logging
+import orjson
 import os
+import re
+from typing import Optional
 
-app = FastAPI()
+from batch import INT64_MAX, classify_numbers, classify_range
+from fact_store import FactStore
+from facts import NO_FACT, TTLCache, FactClient
+from metrics import RESPONSE_CACHE_LOOKUPS, Gauge, TimingMiddleware, expose, timed
+from classify_pool import TIMEOUT, ClassificationPool
+from properties import CHEAP_MAX_DIGITS, budgets, evaluate, expensive, plan, public_fields
+
+NUMBERS_API_URL = os.environ.get("NUMBERS_API_URL", "http://numbersapi.com/")
+# Lets benchmarks route upstream calls to an in-process stub instead of the network.
+UPSTREAM_TRANSPORT: Optional[httpx.AsyncBaseTransport] = None
+FACT_TIMEOUT = float(os.environ.get("FACT_TIMEOUT", 2.0))
+FACT_MAX_CONNECTIONS = int(os.environ.get("FACT_MAX_CONNECTIONS", 100))
+FACT_CACHE_SIZE = int(os.environ.get("FACT_CACHE_SIZE", 10_000))
+FACT_CACHE_TTL = float(os.environ.get("FACT_CACHE_TTL", 86_400))
+FACT_CACHE_STALE_TTL = float(os.environ.get("FACT_CACHE_STALE_TTL", 3_600))
+FACT_STORE_PATH = os.environ.get("FACT_STORE_PATH")
+FACT_STORE_FLUSH_INTERVAL = float(os.environ.get("FACT_STORE_FLUSH_INTERVAL", 60))
+FACT_STORE_MAX_PENDING = int(os.environ.get("FACT_STORE_MAX_PENDING", 100_000))
+MAX_NUMBER_DIGITS = int(os.environ.get("MAX_NUMBER_DIGITS", 100))
+if MAX_NUMBER_DIGITS > CHEAP_MAX_DIGITS:
+    raise ValueError(f"MAX_NUMBER_DIGITS may be at most {CHEAP_MAX_DIGITS}; longer numbers would stall the event loop")
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", 100_000))
+MAX_RANGE_SIZE = int(os.environ.get("MAX_RANGE_SIZE", 1_000_000))
+MAX_FACT_BATCH_SIZE = int(os.environ.get("MAX_FACT_BATCH_SIZE", 1_000))
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", 4_096))
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "").lower() in ("1", "true", "yes")
+BATCH_CHUNK_SIZE = 65_536
+FACT_RANGE_CONCURRENCY = 16
+CLASSIFY_WORKERS = int(os.environ.get("CLASSIFY_WORKERS", os.cpu_count() or 1))
+CLASSIFY_TIMEOUT = float(os.environ.get("CLASSIFY_TIMEOUT", 1.0))
+CLASSIFY_INLINE_LIMIT = int(os.environ.get("CLASSIFY_INLINE_LIMIT", 2 ** 32))
+CLASSIFY_MAX_ADMITTED = int(os.environ.get("CLASSIFY_MAX_ADMITTED", 2 * CLASSIFY_WORKERS))
+
+# Response fields in output order; "number" is always included.
+FIELDS = public_fields() + ["fun_fact"]
+BATCH_FIELDS = ("is_prime", "is_prime_probabilistic", "is_perfect", "properties", "digit_sum")
+
+# One optional minus sign and ASCII digits only: str.isdigit() also accepts
+# characters such as "²" that int() rejects.
+NUMBER_PATTERN = re.compile(r"-?[0-9]{1,%d}" % MAX_NUMBER_DIGITS)
+
+# Pre-encoded 400 bodies; only the offending input is encoded per request.
+INVALID_NUMBER_TEMPLATE = b'{"number":%b,' + orjson.dumps({
+    "error": True,
+    "message": f"Invalid number format. Please provide a valid integer of at most {MAX_NUMBER_DIGITS} digits.",
+})[1:]
+INVALID_INPUT_BODY = orjson.dumps({"error": True, "message": "Invalid input. Please provide a valid number."})
+UNKNOWN_FIELDS_TEMPLATE = b'{"fields":%b,' + orjson.dumps({
+    "error": True,
+    "message": f"Unknown fields. Choose from {', '.join(FIELDS)}.",
+})[1:]
+BATCH_TOO_LARGE_BODY = orjson.dumps({
+    "error": True,
+    "message": f"At most {MAX_BATCH_SIZE} numbers can be classified per request.",
+})
+NUMBER_TOO_LONG_BODY = orjson.dumps({"error": True, "message": f"Numbers must have at most {MAX_NUMBER_DIGITS} digits."})
+FACT_BATCH_TOO_LARGE_BODY = orjson.dumps({
+    "error": True,
+    "message": f"Fun facts can be included for at most {MAX_FACT_BATCH_SIZE} numbers per request.",
+})
+INVALID_RANGE_BODY = orjson.dumps({
+    "error": True,
+    "message": f"Provide start <= end within a 64-bit range, spanning at most {MAX_RANGE_SIZE} numbers.",
+})
+# Every other error, e.g. 404s or an unparseable body, in the same shape.
+ERROR_TEMPLATE = b'{"error":true,"message":%b}'
+
+logger = logging.getLogger(__name__)
+
+async def refill_fact_store(store: FactStore):
+    # Periodically merge facts fetched upstream into the store, and pick up
+    # merges made by other workers. A failed merge keeps its facts pending
+    # and is retried on the next round.
+    while True:
+        await asyncio.sleep(FACT_STORE_FLUSH_INTERVAL)
+        try:
+            await asyncio.to_thread(store.flush)
+            await asyncio.to_thread(store.reload)
+        except Exception:
+            logger.exception("Could not refill the fact store at %s", store.path)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    store = FactStore(FACT_STORE_PATH, max_pending=FACT_STORE_MAX_PENDING) if FACT_STORE_PATH else None
+    # One pooled upstream client per worker, shared by every request.
+    app.state.facts = FactClient(
+        NUMBERS_API_URL,
+        timeout=FACT_TIMEOUT,
+        max_connections=FACT_MAX_CONNECTIONS,
+        cache_size=FACT_CACHE_SIZE,
+        cache_ttl=FACT_CACHE_TTL,
+        cache_stale_ttl=FACT_CACHE_STALE_TTL,
+        store=store,
+        transport=UPSTREAM_TRANSPORT,
+        range_concurrency=FACT_RANGE_CONCURRENCY,
+    )
+    app.state.pool = ClassificationPool(
+        CLASSIFY_WORKERS,
+        timeout=CLASSIFY_TIMEOUT,
+        inline_limit=CLASSIFY_INLINE_LIMIT,
+        max_admitted=CLASSIFY_MAX_ADMITTED,
+    )
+    # Fully encoded bodies of recent complete responses, reused byte for byte.
+    # They expire with the fun facts they embed.
+    app.state.responses = TTLCache(RESPONSE_CACHE_SIZE, ttl=FACT_CACHE_TTL, stale_ttl=0)
+    refill = asyncio.create_task(refill_fact_store(store)) if store else None
+    yield
+    if refill:
+        refill.cancel()
+        try:
+            store.flush()
+        except Exception:
+            logger.exception("Could not flush the fact store at %s", store.path)
+    app.state.pool.shutdown()
+    await app.state.facts.aclose()
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -11,33 +137,66 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
+)
+app.add_middleware(TimingMiddleware, server_timing=SERVER_TIMING)
+
+Gauge(
+    "classify_pool",
+    "Classification process pool state.",
+    ("stat",),
+    lambda: {(k,): v for k, v in app.state.pool.stats().items()} if hasattr(app.state, "pool") else {},
+)
+Gauge(
+    "response_cache_entries",
+    "Encoded responses held in the hot response cache.",
+    (),
+    lambda: {(): len(app.state.responses)} if hasattr(app.state, "responses") else {},
+)
+Gauge(
+    "fact_cache_entries",
+    "Fun facts held in the in-memory cache.",
+    (),
+    lambda: {(): len(app.state.facts.cache)} if hasattr(app.state, "facts") else {},
 )
 
-NUMBERS_API_URL = "http://numbersapi.com/"
+def classify(n: int) -> dict:
+    # Scalar counterpart of the vectorized batch classifier, for numbers
+    # outside the int64 range. Batches are classified in a worker thread, and
+    # kept out of the per-request classifier timings.
+    values = evaluate(n, plan(BATCH_FIELDS), observe=False)
+    return {"number": n, **{field: values[field] for field in BATCH_FIELDS}}
 
-def is_prime(n: int) -> bool:
-    if n < 2:
-        return False
-    for i in range(2, int(n ** 0.5) + 1):
-        if n % i == 0:
-            return False
-    return True
+def encode_ndjson(rows: list[dict]) -> bytes:
+    return b"".join(dumps(row) + b"\n" for row in rows)
 
-def sum_of_digits(n: int) -> int:
-    return sum(int(digit) for digit in str(abs(n)))
+async def stream_ndjson(chunks, fact_client: FactClient, facts: bool):
+    # Each chunk is classified in one vectorized pass and written out before
+    # the next one is computed, so large ranges are never held in memory.
+    # Classifying and encoding a chunk takes tens of milliseconds, so both
+    # run in a thread to keep the event loop serving other requests.
+    for chunk in chunks:
+        rows = await asyncio.to_thread(list, chunk)
+        if facts:
+            found = await fact_client.get_many(row["number"] for row in rows)
+            for row in rows:
+                row["fun_fact"] = found.get(row["number"], NO_FACT)
+        yield await asyncio.to_thread(encode_ndjson, rows)
 
-def is_perfect(n: int) -> bool:
-    if n < 1:
-        return False
-    return sum(i for i in range(1, n) if n % i == 0) == n
+def dumps(obj) -> bytes:
+    # orjson only encodes 64-bit integers; larger numbers fall back to the
+    # standard library, which keeps them exact.
+    try:
+        return orjson.dumps(obj)
+    except TypeError:
+        return json.dumps(obj, separators=(",", ":")).encode()
 
-def is_armstrong(n: int) -> bool:
-    digits = [int(d) for d in str(abs(n))]
-    power = len(digits)
-    return sum(d ** power for d in digits) == abs(n)
+def bad_request(body: bytes) -> Response:
+    return Response(body, status_code=400, media_type="application/json")
 
-def get_parity(n: int) -> str:
-    return "even" if n % 2 == 0 else "odd"
+def chunked(numbers: list[int]):
+    for i in range(0, len(numbers), BATCH_CHUNK_SIZE):
+        yield numbers[i : i + BATCH_CHUNK_SIZE]
 
 @app.get("/")
 def read_root():
@@ -46,50 +205,112 @@ def read_root():
     }
 
 @app.get("/api/classify-number")
-async def get_number_fact(number: str = Query(..., description="Enter a valid integer")):
-    # **FIXED: Enhanced input validation**
-    if not number.lstrip("-").isdigit():  # Ensures only integers are accepted
-        return HTTPException(
-            status_code=400,
-            detail={
-                "number": number,
-                "error": True,
-                "message": "Invalid number format. Please provide a valid integer.",
-            }
-        )
-
-    number = int(number)  # Convert the valid string to an integer
-
-    # Determine properties
-    properties = []
-    if is_armstrong(number):
-        properties.append("armstrong")
-    properties.append(get_parity(number))
-
-    # Fetch fun fact
-    async with httpx.AsyncClient() as client:
+async def get_number_fact(
+    request: Request,
+    number: str = Query(..., description="Enter a valid integer"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (default: all)"),
+):
+    with timed("validation"):
+        # Ensures only integers of a bounded size are accepted
+        if not NUMBER_PATTERN.fullmatch(number):
+            return bad_request(INVALID_NUMBER_TEMPLATE % orjson.dumps(number))
+
+        requested = {f.strip() for f in fields.split(",") if f.strip()} if fields else set()
+        requested = requested or set(FIELDS)
+        unknown = requested - set(FIELDS)
+        if unknown:
+            return bad_request(UNKNOWN_FIELDS_TEMPLATE % orjson.dumps(sorted(unknown)))
+        selected = [field for field in FIELDS if field in requested]
+
+        number = int(number)  # Convert the valid string to an integer
+
+    key = (number, tuple(selected))
+    body, _ = request.app.state.responses.get(key)
+    RESPONSE_CACHE_LOOKUPS.inc("miss" if body is None else "hit")
+    if body is not None:
+        return Response(body, media_type="application/json")
+
+    # Fetch the fun fact while the expensive properties run off the event loop
+    fun_fact = None
+    if "fun_fact" in requested:
+        fun_fact = asyncio.ensure_future(request.app.state.facts.get(number))
+        selected.remove("fun_fact")
+    with timed("classify"):
+        needed = plan(selected)
         try:
-            response = await client.get(f"{NUMBERS_API_URL}{number}/math")
-            response.raise_for_status()
-            fun_fact = response.text
-        except httpx.HTTPStatusError:
-            fun_fact = "No fact available"
+            pooled = await request.app.state.pool.evaluate(number, expensive(needed), budgets(needed))
+        except BaseException:
+            if fun_fact is not None:
+                fun_fact.cancel()
+            raise
+        values = evaluate(number, needed, pooled)
 
-    return {
-        "number": number,
-        "is_prime": is_prime(number),
-        "is_perfect": is_perfect(number),
-        "properties": properties,
-        "digit_sum": sum_of_digits(number),
-        "fun_fact": fun_fact
-    }
+    response = {"number": number, **{field: values[field] for field in selected}}
+    if "fun_fact" in requested:
+        with timed("fun_fact"):
+            response["fun_fact"] = await fun_fact
+
+    with timed("serialization"):
+        body = dumps(response)
+    # Only complete answers are reused; timeouts and missing facts are retried.
+    if TIMEOUT not in response.values() and response.get("fun_fact") != NO_FACT:
+        request.app.state.responses.put(key, body)
+    return Response(body, media_type="application/json")
+
+@app.get("/metrics")
+def get_metrics():
+    return PlainTextResponse(expose(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/pool")
+def get_pool_stats(request: Request):
+    return request.app.state.pool.stats()
+
+@app.post("/api/classify-numbers")
+async def classify_number_batch(
+    request: Request,
+    numbers: list[int] = Body(..., description="List of integers to classify"),
+    facts: bool = Query(False, description="Include a fun fact for every number"),
+):
+    if len(numbers) > MAX_BATCH_SIZE:
+        return bad_request(BATCH_TOO_LARGE_BODY)
+    if any(len(str(abs(n))) > MAX_NUMBER_DIGITS for n in numbers):
+        return bad_request(NUMBER_TOO_LONG_BODY)
+    if facts and len(numbers) > MAX_FACT_BATCH_SIZE:
+        return bad_request(FACT_BATCH_TOO_LARGE_BODY)
+
+    chunks = (classify_numbers(chunk, classify) for chunk in chunked(numbers))
+    return StreamingResponse(stream_ndjson(chunks, request.app.state.facts, facts), media_type="application/x-ndjson")
+
+@app.get("/api/classify-range")
+async def classify_number_range(
+    request: Request,
+    start: int = Query(..., description="First integer of the range"),
+    end: int = Query(..., description="Last integer of the range (inclusive)"),
+    facts: bool = Query(False, description="Include a fun fact for every number"),
+):
+    if not -INT64_MAX <= start <= end <= INT64_MAX or end - start + 1 > MAX_RANGE_SIZE:
+        return bad_request(INVALID_RANGE_BODY)
+    if facts and end - start + 1 > MAX_FACT_BATCH_SIZE:
+        return bad_request(FACT_BATCH_TOO_LARGE_BODY)
+
+    chunks = (
+        classify_range(lo, min(lo + BATCH_CHUNK_SIZE - 1, end))
+        for lo in range(start, end + 1, BATCH_CHUNK_SIZE)
+    )
+    return StreamingResponse(stream_ndjson(chunks, request.app.state.facts, facts), media_type="application/x-ndjson")
 
 # **Global Exception Handler for FastAPI Validation Errors**
-@app.exception_handler(422)
+@app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request, exc):
-    return HTTPException(
-        status_code=400,
-        detail={"error": True, "message": "Invalid input. Please provide a valid number."}
+    return bad_request(INVALID_INPUT_BODY)
+
+@app.exception_handler(HTTPException)
+async def http_exception_handler(request, exc):
+    return Response(
+        ERROR_TEMPLATE % orjson.dumps(exc.detail),
+        status_code=exc.status_code,
+        headers=exc.headers,
+        media_type="application/json",
     )
 
 if __name__ == "__main__":
@@ -0,0 +1,198 @@
+"""Latency histograms, counters and the Prometheus text exposition.
+
+Every observation is made on the event loop thread (results from the
+process pool are handed back through ``call_soon_threadsafe``), so metrics
+are plain integer and float updates with no locking. Histograms keep
+per-bucket counts and only accumulate them when ``/metrics`` is scraped.
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+import time
+from typing import Callable, Optional
+
+# 50us to ~13s, doubling each step.
+DEFAULT_BUCKETS = tuple(0.00005 * 2 ** i for i in range(19))
+
+REGISTRY: list = []
+
+# Stage timings of the current request, collected for the Server-Timing header.
+_request_timings: ContextVar[Optional[list]] = ContextVar("request_timings", default=None)
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{v}"' for k, v in labels.items())
+    return "{" + inner + "}"
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._children: dict[tuple, _HistogramChild] = {}
+        REGISTRY.append(self)
+
+    def labels(self, *values: str) -> _HistogramChild:
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = _HistogramChild(self.buckets)
+        return child
+
+    def observe(self, value: float, *labels: str) -> None:
+        self.labels(*labels).observe(value)
+
+    def expose(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:.6g}"
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': le})} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {child.sum}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        REGISTRY.append(self)
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def total(self) -> float:
+        return sum(self._values.values())
+
+    def expose(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for values, value in list(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, values)))} {value}")
+        return lines
+
+
+class Gauge:
+    """A gauge read from ``fn`` at scrape time; ``fn`` returns ``{label values: value}``."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...], fn: Callable[[], dict]):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.fn = fn
+        REGISTRY.append(self)
+
+    def expose(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for values, value in self.fn().items():
+            lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, values)))} {value}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "classify_stage_duration_seconds", "Time spent in each stage of a classify request.", ("stage",)
+)
+CLASSIFIER_SECONDS = Histogram(
+    "classifier_duration_seconds", "Time spent evaluating each classifier.", ("classifier",)
+)
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "End-to-end request latency.", ("route", "status")
+)
+UPSTREAM_SECONDS = Histogram("upstream_request_duration_seconds", "Latency of calls to the numbers API.")
+UPSTREAM_REQUESTS = Counter("upstream_requests_total", "Calls to the numbers API by outcome.", ("outcome",))
+RESPONSE_CACHE_LOOKUPS = Counter(
+    "response_cache_lookups_total", "Lookups in the encoded response cache by result.", ("result",)
+)
+FACT_LOOKUPS = Counter("fact_lookups_total", "Fun-fact lookups by where they were answered.", ("source",))
+
+
+def _fact_hit_ratio() -> dict:
+    total = FACT_LOOKUPS.total()
+    hits = sum(FACT_LOOKUPS.value(source) for source in ("cache", "stale", "store"))
+    return {(): hits / total if total else 0.0}
+
+
+FACT_HIT_RATIO = Gauge(
+    "fact_cache_hit_ratio", "Share of fun-fact lookups answered without waiting on upstream.", (), _fact_hit_ratio
+)
+
+
+def record(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+@contextmanager
+def timed(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def expose() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.expose())
+    return "\n".join(lines) + "\n"
+
+
+class TimingMiddleware:
+    """Records request latency and optionally reports stage timings in ``Server-Timing``."""
+
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = []
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing and timings:
+                    header = ", ".join(f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in timings)
+                    message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(time.perf_counter() - start, route.path if route else "unmatched", str(status))
@@ -0,0 +1,35 @@
+"""A local stand-in for numbersapi.com, for development and benchmarking.
+
+Run it with ``uvicorn numbers_stub:app --port 9000`` and point the service
+at it with ``NUMBERS_API_URL=http://127.0.0.1:9000/``, or mount it in-process
+through ``httpx.ASGITransport(app=app)``. Like the real API, ``/{start}..{end}/math``
+returns a JSON object of facts for up to 100 numbers. ``STUB_LATENCY`` adds a fixed
+delay in seconds to every response.
+"""
+import asyncio
+import os
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+STUB_LATENCY = float(os.environ.get("STUB_LATENCY", 0))
+
+app = FastAPI()
+
+
+def fact(number: int) -> str:
+    return f"{number} is a number for which the stub has no interesting mathematical fact."
+
+
+@app.get("/{start}..{end}/math")
+async def math_facts(start: int, end: int):
+    if STUB_LATENCY:
+        await asyncio.sleep(STUB_LATENCY)
+    return {str(n): fact(n) for n in range(start, min(end, start + 99) + 1)}
+
+
+@app.get("/{number}/math", response_class=PlainTextResponse)
+async def math_fact(number: int):
+    if STUB_LATENCY:
+        await asyncio.sleep(STUB_LATENCY)
+    return fact(number)
@@ -0,0 +1,140 @@
+"""Tiered primality testing.
+
+Small numbers are answered from a sieve bitset built at import time,
+64-bit numbers use deterministic Miller-Rabin bases, and anything larger
+falls back to the Baillie-PSW strong probable-prime test.
+"""
+from math import isqrt
+
+SIEVE_LIMIT = 1 << 20
+MR_DETERMINISTIC_LIMIT = 1 << 64
+
+# Bases proven sufficient for every n < 3.3 * 10**24, which covers 64 bits.
+MR_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)
+
+
+def _build_sieve(limit: int) -> bytearray:
+    # One bit per odd number: bit i stands for 2 * i + 1.
+    size = limit // 2 + 1
+    bits = bytearray(b"\xff") * ((size + 7) // 8)
+    bits[0] &= ~1  # 1 is not prime
+    for i in range(1, (isqrt(limit) - 1) // 2 + 1):
+        if bits[i >> 3] >> (i & 7) & 1:
+            p = 2 * i + 1
+            for j in range(p * p // 2, size, p):
+                bits[j >> 3] &= ~(1 << (j & 7))
+    return bits
+
+
+_SIEVE = _build_sieve(SIEVE_LIMIT)
+
+
+def _sieve_lookup(n: int) -> bool:
+    if n == 2:
+        return True
+    if n < 2 or n % 2 == 0:
+        return False
+    i = n >> 1
+    return bool(_SIEVE[i >> 3] >> (i & 7) & 1)
+
+
+def small_primes(limit: int):
+    """Yield the primes below ``limit`` (which must not exceed SIEVE_LIMIT)."""
+    if limit > 2:
+        yield 2
+    for n in range(3, min(limit, SIEVE_LIMIT + 1), 2):
+        if _sieve_lookup(n):
+            yield n
+
+
+def _is_strong_probable_prime(n: int, base: int) -> bool:
+    d = n - 1
+    s = 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    x = pow(base, d, n)
+    if x == 1 or x == n - 1:
+        return True
+    for _ in range(s - 1):
+        x = x * x % n
+        if x == n - 1:
+            return True
+    return False
+
+
+def _jacobi(a: int, n: int) -> int:
+    a %= n
+    result = 1
+    while a:
+        while a % 2 == 0:
+            a //= 2
+            if n % 8 in (3, 5):
+                result = -result
+        a, n = n, a
+        if a % 4 == 3 and n % 4 == 3:
+            result = -result
+        a %= n
+    return result if n == 1 else 0
+
+
+def _is_strong_lucas_probable_prime(n: int) -> bool:
+    # Selfridge's method A: first D in 5, -7, 9, -11, ... with (D/n) = -1.
+    d = 5
+    while True:
+        j = _jacobi(d, n)
+        if j == -1:
+            break
+        if j == 0 and abs(d) != n:
+            return False
+        d = -d - 2 if d > 0 else -d + 2
+        if d == 13 and isqrt(n) ** 2 == n:
+            return False
+    p, q = 1, (1 - d) // 4
+
+    k = n + 1
+    s = 0
+    while k % 2 == 0:
+        k //= 2
+        s += 1
+
+    # Binary ladder for U_k, V_k, Q^k modulo n.
+    inv2 = (n + 1) // 2
+    u, v, qk = 1, p, q % n
+    for bit in bin(k)[3:]:
+        u, v = u * v % n, (v * v - 2 * qk) % n
+        qk = qk * qk % n
+        if bit == "1":
+            u, v = (p * u + v) * inv2 % n, (d * u + p * v) * inv2 % n
+            qk = qk * q % n
+
+    if u == 0 or v == 0:
+        return True
+    for _ in range(s - 1):
+        v = (v * v - 2 * qk) % n
+        if v == 0:
+            return True
+        qk = qk * qk % n
+    return False
+
+
+def is_probabilistic(n: int, prime: bool) -> bool:
+    """Whether the ``is_prime(n)`` result ``prime`` is only a probable answer.
+
+    Composite verdicts are always certain; only a "prime" answer from the
+    Baillie-PSW test above 64 bits is probabilistic.
+    """
+    return prime and n >= MR_DETERMINISTIC_LIMIT
+
+
+def is_prime(n: int) -> bool:
+    if n <= SIEVE_LIMIT:
+        return _sieve_lookup(n)
+    if n % 2 == 0:
+        return False
+    for p in MR_BASES[1:]:
+        if n % p == 0:
+            return False
+    if n < MR_DETERMINISTIC_LIMIT:
+        return all(_is_strong_probable_prime(n, a) for a in MR_BASES)
+    return _is_strong_probable_prime(n, 2) and _is_strong_lucas_probable_prime(n)
@@ -0,0 +1,194 @@
+"""Registry of number classifiers.
+
+Each classifier declares its cost and the classifiers it depends on, so a
+request only evaluates what its selected fields need. Expensive classifiers
+take nothing but the number, which lets them run in the process pool, and
+may declare a time budget there; cheap ones are evaluated inline in
+registration order, which is also the order fields appear in responses.
+A classifier is cheap when its worst case over the accepted input sizes is
+small, however large the number.
+"""
+import time
+from typing import Any, Callable, Iterable, NamedTuple, Optional
+
+from classify_pool import TIMEOUT
+from metrics import CLASSIFIER_SECONDS
+from factorization import PERFECT_NUMBERS_BOUND, divisor_info, is_perfect
+from primality import is_prime, is_probabilistic
+
+CHEAP = "cheap"
+EXPENSIVE = "expensive"
+# Largest input, in digits, for which cheap classifiers stay cheap: is_prime
+# takes at most about 7ms on a prime of this size, and is_perfect is a table
+# lookup since every such number is below PERFECT_NUMBERS_BOUND. Callers must
+# not accept longer numbers, as cheap classifiers run on the event loop.
+CHEAP_MAX_DIGITS = 200
+assert 10 ** CHEAP_MAX_DIGITS <= PERFECT_NUMBERS_BOUND
+
+# All 88 Armstrong (narcissistic) numbers; none exist beyond 39 digits.
+# 0 is included since its single digit raised to the first power is itself.
+ARMSTRONG_NUMBERS = frozenset((
+    0,
+    1, 2, 3, 4, 5, 6, 7, 8, 9, 153, 370, 371, 407, 1634, 8208, 9474, 54748,
+    92727, 93084, 548834, 1741725, 4210818, 9800817, 9926315, 24678050,
+    24678051, 88593477, 146511208, 472335975, 534494836, 912985153, 4679307774,
+    32164049650, 32164049651, 40028394225, 42678290603, 44708635679,
+    49388550606, 82693916578, 94204591914, 28116440335967, 4338281769391370,
+    4338281769391371, 21897142587612075, 35641594208964132, 35875699062250035,
+    1517841543307505039, 3289582984443187032, 4498128791164624869,
+    4929273885928088826, 63105425988599693916, 128468643043731391252,
+    449177399146038697307, 21887696841122916288858, 27879694893054074471405,
+    27907865009977052567814, 28361281321319229463398, 35452590104031691935943,
+    174088005938065293023722, 188451485447897896036875,
+    239313664430041569350093, 1550475334214501539088894,
+    1553242162893771850669378, 3706907995955475988644380,
+    3706907995955475988644381, 4422095118095899619457938,
+    121204998563613372405438066, 121270696006801314328439376,
+    128851796696487777842012787, 174650464499531377631639254,
+    177265453171792792366489765, 14607640612971980372614873089,
+    19008174136254279995012734740, 19008174136254279995012734741,
+    23866716435523975980390369295, 1145037275765491025924292050346,
+    1927890457142960697580636236639, 2309092682616190307509695338915,
+    17333509997782249308725103962772, 186709961001538790100634132976990,
+    186709961001538790100634132976991, 1122763285329372541592822900204593,
+    12639369517103790328947807201478392, 12679937780272278566303885594196922,
+    1219167219625434121569735803609966019,
+    12815792078366059955099770545296129367,
+    115132219018763992565095597973971522400,
+    115132219018763992565095597973971522401,
+))
+
+
+class Classifier(NamedTuple):
+    name: str
+    fn: Callable[..., Any]
+    cost: str
+    depends: tuple[str, ...]
+    public: bool
+    budget: Optional[float]  # seconds in the pool; None uses the pool's timeout
+
+
+REGISTRY: dict[str, Classifier] = {}
+
+
+def classifier(
+    name: Optional[str] = None,
+    *,
+    cost: str = CHEAP,
+    depends: tuple[str, ...] = (),
+    public: bool = True,
+    budget: Optional[float] = None,
+):
+    """Register a classifier; dependencies are passed to it as keyword arguments."""
+    def register(fn):
+        key = name or fn.__name__
+        if cost == EXPENSIVE and depends:
+            raise ValueError(f"expensive classifier {key} cannot have dependencies")
+        if cost != EXPENSIVE and budget is not None:
+            raise ValueError(f"cheap classifier {key} runs inline and cannot have a budget")
+        missing = [d for d in depends if d not in REGISTRY]
+        if missing:
+            raise ValueError(f"{key} depends on unregistered classifiers {missing}")
+        REGISTRY[key] = Classifier(key, fn, cost, depends, public, budget)
+        return fn
+    return register
+
+
+classifier("is_prime")(is_prime)
+
+
+@classifier(depends=("is_prime",))
+def is_prime_probabilistic(n: int, is_prime: bool) -> bool:
+    return is_probabilistic(n, is_prime)
+
+
+classifier("is_perfect")(is_perfect)
+
+
+@classifier(public=False)
+def is_armstrong(n: int) -> bool:
+    return abs(n) in ARMSTRONG_NUMBERS
+
+
+@classifier(public=False)
+def parity(n: int) -> str:
+    return "even" if n % 2 == 0 else "odd"
+
+
+@classifier(depends=("is_armstrong", "parity"))
+def properties(n: int, is_armstrong: bool, parity: str) -> list[str]:
+    return ["armstrong", parity] if is_armstrong else [parity]
+
+
+@classifier()
+def digit_sum(n: int) -> int:
+    return sum(int(digit) for digit in str(abs(n)))
+
+
+classifier("divisor_info", cost=EXPENSIVE, public=False)(divisor_info)
+
+
+@classifier(depends=("divisor_info",))
+def prime_factors(n: int, divisor_info: dict) -> Optional[list[int]]:
+    return divisor_info["prime_factors"]
+
+
+@classifier(depends=("divisor_info",))
+def divisor_count(n: int, divisor_info: dict) -> Optional[int]:
+    return divisor_info["divisor_count"]
+
+
+@classifier(depends=("divisor_info",))
+def abundance(n: int, divisor_info: dict) -> Optional[str]:
+    return divisor_info["abundance"]
+
+
+def public_fields() -> list[str]:
+    return [c.name for c in REGISTRY.values() if c.public]
+
+
+def plan(fields: Iterable[str]) -> list[str]:
+    """Classifiers needed for ``fields``, in an order that respects dependencies."""
+    needed = set()
+    stack = list(fields)
+    while stack:
+        name = stack.pop()
+        if name not in needed:
+            needed.add(name)
+            stack.extend(REGISTRY[name].depends)
+    # Dependencies must be registered first, so registration order is a
+    # valid evaluation order.
+    return [name for name in REGISTRY if name in needed]
+
+
+def expensive(names: Iterable[str]) -> dict[str, Callable[[int], Any]]:
+    return {name: REGISTRY[name].fn for name in names if REGISTRY[name].cost == EXPENSIVE}
+
+
+def budgets(names: Iterable[str]) -> dict[str, float]:
+    return {name: REGISTRY[name].budget for name in names if REGISTRY[name].budget is not None}
+
+
+def evaluate(n: int, names: Iterable[str], evaluated: Optional[dict] = None, observe: bool = True) -> dict[str, Any]:
+    """Evaluate ``names`` in order, reusing results already in ``evaluated``.
+
+    A classifier whose dependency came back as TIMEOUT is TIMEOUT as well.
+    Pass ``observe=False`` off the event loop thread, since metrics are not
+    thread-safe.
+    """
+    values = dict(evaluated or {})
+    for name in names:
+        if name in values:
+            continue
+        c = REGISTRY[name]
+        deps = {d: values[d] for d in c.depends}
+        if TIMEOUT in deps.values():
+            values[name] = TIMEOUT
+            continue
+        if not observe:
+            values[name] = c.fn(n, **deps)
+            continue
+        start = time.perf_counter()
+        values[name] = c.fn(n, **deps)
+        CLASSIFIER_SECONDS.observe(time.perf_counter() - start, name)
+    return values
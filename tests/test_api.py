@@ -0,0 +1,141 @@
+import json
+
+import httpx
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from metrics import CLASSIFIER_SECONDS, RESPONSE_CACHE_LOOKUPS
+import numbers_stub
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "UPSTREAM_TRANSPORT", httpx.ASGITransport(app=numbers_stub.app))
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.mark.parametrize("number", ["371", "-7", "0", "1" * main.MAX_NUMBER_DIGITS])
+def test_valid_numbers(client, number):
+    response = client.get("/api/classify-number", params={"number": number, "fields": "digit_sum"})
+    assert response.status_code == 200
+    assert response.json()["number"] == int(number)
+
+
+@pytest.mark.parametrize("number", ["abc", "", "-", "--5", "5-", "+5", "²", "١٢٣", "12.5", " 5", "1" * (main.MAX_NUMBER_DIGITS + 1)])
+def test_invalid_numbers(client, number):
+    response = client.get("/api/classify-number", params={"number": number})
+    assert response.status_code == 400
+    assert response.json()["number"] == number
+    assert response.json()["error"] is True
+
+
+def assert_error(response, status_code=400):
+    assert response.status_code == status_code
+    assert response.headers["content-type"] == "application/json"
+    body = response.json()
+    assert body["error"] is True
+    assert isinstance(body["message"], str)
+    return body
+
+
+def test_unknown_fields(client):
+    response = client.get("/api/classify-number", params={"number": "7", "fields": "is_prime,bogus,also_bogus"})
+    assert assert_error(response)["fields"] == ["also_bogus", "bogus"]
+
+
+@pytest.mark.parametrize(
+    "body",
+    [[1] * (main.MAX_BATCH_SIZE + 1), [10 ** main.MAX_NUMBER_DIGITS], {"a": 1}, [1.5]],
+)
+def test_invalid_batches(client, body):
+    assert_error(client.post("/api/classify-numbers", json=body))
+
+
+def test_unparseable_body(client):
+    response = client.post(
+        "/api/classify-numbers", content=b"[1, 2", headers={"content-type": "application/json"}
+    )
+    assert_error(response)
+
+
+@pytest.mark.parametrize("start, end", [(5, 3), (0, main.MAX_RANGE_SIZE), (2 ** 63, 2 ** 63 + 1)])
+def test_invalid_ranges(client, start, end):
+    assert_error(client.get("/api/classify-range", params={"start": start, "end": end}))
+
+
+def test_unknown_route(client):
+    assert_error(client.get("/api/nope"), 404)
+    assert_error(client.delete("/api/classify-number"), 405)
+
+
+def test_batch_fallback_does_not_touch_metrics(client):
+    before = {name: child.sum for name, child in CLASSIFIER_SECONDS._children.items()}
+    response = client.post("/api/classify-numbers", json=[2 ** 70, 2 ** 89 - 1])
+    assert response.status_code == 200
+    assert {name: child.sum for name, child in CLASSIFIER_SECONDS._children.items()} == before
+
+
+def test_batch_facts(client):
+    response = client.get("/api/classify-range", params={"start": 0, "end": 150, "facts": True})
+    rows = [orjson.loads(line) for line in response.content.splitlines()]
+    assert [row["fun_fact"] for row in rows] == [numbers_stub.fact(n) for n in range(151)]
+    assert len(client.app.state.facts.cache) == 0
+
+
+def test_batch_facts_are_capped(client):
+    too_many = main.MAX_FACT_BATCH_SIZE + 1
+    assert_error(client.post("/api/classify-numbers", params={"facts": True}, json=list(range(too_many))))
+    assert_error(client.get("/api/classify-range", params={"start": 1, "end": too_many, "facts": True}))
+    assert client.get("/api/classify-range", params={"start": 1, "end": too_many}).status_code == 200
+
+
+def test_fields_subset_in_registry_order(client):
+    response = client.get("/api/classify-number", params={"number": "28", "fields": "fun_fact, digit_sum,is_perfect"})
+    assert list(response.json()) == ["number", "is_perfect", "digit_sum", "fun_fact"]
+    assert response.json()["fun_fact"] == numbers_stub.fact(28)
+
+
+def test_fields_default_to_all(client):
+    response = client.get("/api/classify-number", params={"number": "28"})
+    assert list(response.json()) == ["number", *main.FIELDS]
+
+
+def test_repeated_requests_reuse_the_encoded_body(client):
+    params = {"number": "28"}
+    first = client.get("/api/classify-number", params=params)
+    hits = RESPONSE_CACHE_LOOKUPS.value("hit")
+    second = client.get("/api/classify-number", params=params)
+    assert second.content == first.content
+    assert RESPONSE_CACHE_LOOKUPS.value("hit") == hits + 1
+    assert len(client.app.state.responses) == 1
+
+
+def test_missing_facts_are_not_cached(monkeypatch):
+    failing = httpx.MockTransport(lambda request: httpx.Response(503))
+    monkeypatch.setattr(main, "UPSTREAM_TRANSPORT", failing)
+    with TestClient(main.app) as client:
+        response = client.get("/api/classify-number", params={"number": "28"})
+        assert response.json()["fun_fact"] == main.NO_FACT
+        assert len(client.app.state.responses) == 0
+
+
+def test_timeouts_are_not_cached(client, monkeypatch):
+    monkeypatch.setattr(client.app.state.pool, "timeout", 0)
+    response = client.get("/api/classify-number", params={"number": str(2 ** 89 - 1), "fields": "divisor_count"})
+    assert response.json()["divisor_count"] == main.TIMEOUT
+    assert len(client.app.state.responses) == 0
+
+
+@pytest.mark.parametrize("number", [2 ** 64, 2 ** 89 - 1, -(10 ** 30)])
+def test_numbers_beyond_64_bits_stay_exact(client, number):
+    response = client.get("/api/classify-number", params={"number": str(number), "fields": "digit_sum"})
+    assert response.status_code == 200
+    assert json.loads(response.content)["number"] == number
+
+
+def test_dumps_falls_back_for_big_integers():
+    assert main.dumps({"number": 7}) == orjson.dumps({"number": 7})
+    assert main.dumps({"number": 2 ** 64, "ok": True}) == b'{"number":18446744073709551616,"ok":true}'
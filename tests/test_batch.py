@@ -0,0 +1,90 @@
+import json
+
+import httpx
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from batch import INT64_MAX, SEGMENTED_SIEVE_LIMIT, classify_numbers, digit_sums, prime_mask, segmented_sieve
+import main
+import numbers_stub
+from primality import SIEVE_LIMIT, is_prime
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "UPSTREAM_TRANSPORT", httpx.ASGITransport(app=numbers_stub.app))
+    with TestClient(main.app) as client:
+        yield client
+
+
+def ndjson(response) -> list[dict]:
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    # The standard library keeps numbers beyond 64 bits exact.
+    return [json.loads(line) for line in response.content.splitlines()]
+
+
+@pytest.mark.parametrize(
+    "start, end",
+    [
+        (-300, 300),
+        (SIEVE_LIMIT - 200, SIEVE_LIMIT + 200),
+        (SEGMENTED_SIEVE_LIMIT - 100, SEGMENTED_SIEVE_LIMIT + 100),
+        (INT64_MAX - 100, INT64_MAX),
+        (-INT64_MAX, -INT64_MAX + 50),
+    ],
+)
+def test_range_matches_scalar_classification(client, start, end):
+    rows = ndjson(client.get("/api/classify-range", params={"start": start, "end": end}))
+    assert rows == [main.classify(n) for n in range(start, end + 1)]
+
+
+def test_range_spanning_several_chunks(client, monkeypatch):
+    monkeypatch.setattr(main, "BATCH_CHUNK_SIZE", 100)
+    rows = ndjson(client.get("/api/classify-range", params={"start": -150, "end": 349}))
+    assert rows == [main.classify(n) for n in range(-150, 350)]
+
+
+NUMBERS = [
+    0, 1, 2, -2, 6, 28, 153, -371, 8128, 9474,
+    SIEVE_LIMIT - 1, SIEVE_LIMIT, SIEVE_LIMIT + 1, SIEVE_LIMIT + 3,
+    2 ** 31 - 1, 2 ** 61 - 1, 4338281769391371,
+    INT64_MAX - 24, INT64_MAX, -INT64_MAX,
+]
+
+
+def test_int64_list_matches_scalar_classification(client):
+    rows = ndjson(client.post("/api/classify-numbers", json=NUMBERS))
+    assert rows == [main.classify(n) for n in NUMBERS]
+
+
+def test_mixed_list_falls_back_for_numbers_beyond_int64(client):
+    numbers = NUMBERS + [INT64_MAX + 1, -(2 ** 64) - 1, 2 ** 89 - 1, 2 ** 70, 10 ** 99]
+    response = client.post("/api/classify-numbers", json=numbers)
+    rows = ndjson(response)
+    assert rows == [main.classify(n) for n in numbers]
+    assert rows[-3]["is_prime_probabilistic"] is True
+
+
+def test_classify_numbers_preserves_order_and_duplicates():
+    numbers = [7, 7, -3, 2 ** 65, 7]
+    assert [row["number"] for row in classify_numbers(numbers, main.classify)] == numbers
+
+
+def test_segmented_sieve():
+    assert segmented_sieve(10, 5).size == 0
+    lo, hi = SIEVE_LIMIT ** 2 - 1000, SIEVE_LIMIT ** 2
+    assert segmented_sieve(lo, hi).tolist() == [is_prime(n) for n in range(lo, hi + 1)]
+    assert segmented_sieve(-10, 10).tolist() == [is_prime(n) for n in range(0, 11)]
+
+
+def test_prime_mask_with_spread_out_numbers():
+    numbers = [-7, 0, 2, 97, SIEVE_LIMIT + 7, 10 ** 12 + 39, 2 ** 61 - 1, INT64_MAX]
+    assert prime_mask(np.array(numbers, dtype=np.int64)).tolist() == [is_prime(n) for n in numbers]
+
+
+def test_digit_sums():
+    numbers = [0, -19, 371, INT64_MAX, -INT64_MAX]
+    expected = [sum(map(int, str(abs(n)))) for n in numbers]
+    assert digit_sums(np.array(numbers, dtype=np.int64)).tolist() == expected
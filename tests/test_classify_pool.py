@@ -0,0 +1,66 @@
+import asyncio
+from concurrent.futures.process import BrokenProcessPool
+import os
+import time
+
+import pytest
+
+from classify_pool import TIMEOUT, ClassificationPool
+
+
+def square(n: int) -> int:
+    return n * n
+
+
+def slow_square(n: int) -> int:
+    time.sleep(0.3)
+    return n * n
+
+
+@pytest.fixture
+def pool():
+    pool = ClassificationPool(2, timeout=0.1, inline_limit=1000, max_admitted=4)
+    yield pool
+    pool.shutdown()
+
+
+def test_small_numbers_run_inline(pool):
+    assert asyncio.run(pool.evaluate(12, {"square": slow_square})) == {"square": 144}
+    assert pool.stats()["in_flight"] == 0
+
+
+def test_property_past_its_budget_times_out(pool):
+    results = asyncio.run(pool.evaluate(1000, {"square": square, "slow": slow_square}))
+    assert results == {"square": 1_000_000, "slow": TIMEOUT}
+
+
+def test_budget_overrides_pool_timeout(pool):
+    results = asyncio.run(pool.evaluate(1000, {"square": square, "slow": slow_square}, {"slow": 2.0}))
+    assert results == {"square": 1_000_000, "slow": 1_000_000}
+
+
+def crash(n: int) -> int:
+    os._exit(1)
+
+
+def test_dead_worker_is_replaced(pool):
+    async def scenario():
+        crashed = await pool.evaluate(1000, {"crash": crash}, {"crash": 5.0})
+        recovered = await pool.evaluate(1000, {"square": square}, {"square": 5.0})
+        return crashed, recovered
+
+    assert asyncio.run(scenario()) == ({"crash": TIMEOUT}, {"square": 1_000_000})
+    assert pool.stats()["admitted"] == 0
+    assert pool.stats()["in_flight"] == 0
+
+
+def test_broken_executor_releases_the_slot(pool, monkeypatch):
+    def refuse(*args):
+        raise BrokenProcessPool()
+
+    broken = pool.executor
+    monkeypatch.setattr(broken, "submit", refuse)
+    assert asyncio.run(pool.evaluate(1000, {"square": square})) == {"square": TIMEOUT}
+    assert pool.executor is not broken
+    assert pool.stats()["admitted"] == 0
+    assert asyncio.run(pool.evaluate(1000, {"square": square}, {"square": 5.0})) == {"square": 1_000_000}
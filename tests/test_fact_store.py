@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+import fact_store
+from fact_store import FactStore
+import main
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / "facts.bin")
+    fact_store.write(path, {1: "one", 3: "three", -5: "minus five"})
+    return path
+
+
+def test_lookup_and_flush(path):
+    store = FactStore(path)
+    assert (store.get(1), store.get(-5), store.get(2)) == ("one", "minus five", None)
+    store.record(2, "two")
+    assert store.get(2) == "two"
+    assert store.flush() == 1
+    assert store.pending == {}
+    assert len(store) == 4
+    assert FactStore(path).get(2) == "two"
+
+
+def test_failed_write_keeps_pending_facts(path, monkeypatch):
+    store = FactStore(path)
+    store.record(2, "two")
+
+    def fail(path, snapshot, facts):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(fact_store, "merge", fail)
+    with pytest.raises(OSError):
+        store.flush()
+    assert store.pending == {2: "two"}
+    assert store.get(2) == "two"
+
+
+def test_fact_recorded_during_flush_is_kept(path, monkeypatch):
+    store = FactStore(path)
+    store.record(2, "two")
+    merge = fact_store.merge
+
+    def merge_then_record(path, snapshot, facts):
+        merge(path, snapshot, facts)
+        store.record(2, "two, revised")
+        store.record(4, "four")
+
+    monkeypatch.setattr(fact_store, "merge", merge_then_record)
+    assert store.flush() == 1
+    assert store.pending == {2: "two, revised", 4: "four"}
+
+
+def test_pending_facts_are_bounded(path):
+    store = FactStore(path, max_pending=2)
+    for n in (10, 11, 12):
+        store.record(n, str(n))
+    store.record(10, "ten")
+    assert store.pending == {10: "ten", 11: "11"}
+
+
+def test_refill_retries_after_a_failed_flush(path, monkeypatch):
+    store = FactStore(path)
+    store.record(2, "two")
+    merge = fact_store.merge
+    attempts = []
+
+    def fail_once(path, snapshot, facts):
+        attempts.append(len(facts))
+        if len(attempts) == 1:
+            raise OSError("disk full")
+        merge(path, snapshot, facts)
+
+    monkeypatch.setattr(fact_store, "merge", fail_once)
+    monkeypatch.setattr(main, "FACT_STORE_FLUSH_INTERVAL", 0.01)
+
+    async def refill_until_flushed():
+        task = asyncio.create_task(main.refill_fact_store(store))
+        try:
+            for _ in range(200):
+                await asyncio.sleep(0.01)
+                if not store.pending:
+                    break
+        finally:
+            task.cancel()
+
+    asyncio.run(refill_until_flushed())
+    assert len(attempts) >= 2
+    assert store.pending == {}
+    assert FactStore(path).get(2) == "two"
+
+
+def test_merge_matches_a_full_rewrite(path, tmp_path):
+    existing = {n: f"fact {n}" * (n % 5) for n in range(-50, 50, 3)}
+    fact_store.write(path, existing)
+    store = FactStore(path)
+    added = {-60: "new low", -50: "replaced", 0: "", 1: "new one", 47: "replaced high", 49: "new", 100: "new high"}
+    for n, fact in added.items():
+        store.record(n, fact)
+    assert store.flush() == len(added)
+
+    expected = str(tmp_path / "expected.bin")
+    fact_store.write(expected, {**existing, **added})
+    with open(path, "rb") as merged, open(expected, "rb") as rewritten:
+        assert merged.read() == rewritten.read()
+    assert dict(store.items()) == {**existing, **added}
+
+
+def test_merge_into_empty_store(tmp_path):
+    path = str(tmp_path / "facts.bin")
+    fact_store.write(path, {})
+    store = FactStore(path)
+    store.record(5, "five")
+    store.flush()
+    assert dict(FactStore(path).items()) == {5: "five"}
@@ -0,0 +1,84 @@
+from math import prod
+
+import pytest
+
+import factorization
+from factorization import (
+    PERFECT_NUMBERS,
+    FactorizationIncomplete,
+    divisor_count,
+    divisor_info,
+    factorize,
+    is_perfect,
+    prime_factors,
+    sigma,
+)
+from primality import is_prime
+
+
+def brute_force_sigma(n: int) -> int:
+    return sum(d for d in range(1, n + 1) if n % d == 0)
+
+
+def test_sigma_and_is_perfect_match_brute_force():
+    for n in range(1, 3000):
+        total = brute_force_sigma(n)
+        assert sigma(n) == total, n
+        assert is_perfect(n) == (total == 2 * n), n
+
+
+def test_is_perfect_rejects_non_positive():
+    assert not is_perfect(0)
+    assert not is_perfect(-6)
+
+
+@pytest.mark.parametrize("n", sorted(PERFECT_NUMBERS))
+def test_every_listed_perfect_number(n):
+    assert is_perfect(n)
+    assert not is_perfect(n + 2)
+
+
+@pytest.mark.parametrize(
+    "n",
+    [
+        1,
+        2,
+        1024,
+        1009 ** 2,  # square of the first prime past the wheel
+        7919 ** 2,
+        (2 ** 31 - 1) ** 2,
+        1009 * 7919 * 104729,
+        2 ** 64 + 1,
+        600851475143,
+        (2 ** 61 - 1) * (2 ** 31 - 1),
+    ],
+)
+def test_factorize_round_trips(n):
+    factors = factorize(n)
+    assert prod(p ** e for p, e in factors.items()) == n
+    assert all(is_prime(p) for p in factors)
+    assert prime_factors(n) == sorted(prime_factors(n))
+    assert divisor_count(n) == prod(e + 1 for e in factors.values())
+
+
+def test_factorize_rejects_non_positive():
+    with pytest.raises(ValueError):
+        factorize(0)
+
+
+def test_divisor_info():
+    assert divisor_info(28) == {"prime_factors": [2, 2, 7], "divisor_count": 6, "abundance": "perfect"}
+    assert divisor_info(12)["abundance"] == "abundant"
+    assert divisor_info(-5) == {"prime_factors": None, "divisor_count": None, "abundance": None}
+
+
+def test_divisor_info_is_none_when_budget_runs_out(monkeypatch):
+    monkeypatch.setattr(factorization, "RHO_MAX_ITERATIONS", 1)
+    n = 1000003 * 1000033  # both factors are past the wheel, so rho is needed
+    factorization._factorize.cache_clear()
+    try:
+        with pytest.raises(FactorizationIncomplete):
+            factorize(n)
+        assert divisor_info(n) == {"prime_factors": None, "divisor_count": None, "abundance": None}
+    finally:
+        factorization._factorize.cache_clear()
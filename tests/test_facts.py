@@ -0,0 +1,131 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from facts import NO_FACT, FactClient
+import metrics
+import numbers_stub
+
+
+class CountingTransport(httpx.ASGITransport):
+    """The in-process stub upstream, counting the requests that reach it."""
+
+    def __init__(self):
+        super().__init__(app=numbers_stub.app)
+        self.calls = 0
+
+    async def handle_async_request(self, request):
+        self.calls += 1
+        return await super().handle_async_request(request)
+
+
+@pytest.fixture
+def transport():
+    return CountingTransport()
+
+
+def run(client: FactClient, scenario):
+    """Run ``scenario()`` on a fresh event loop, closing ``client`` afterwards."""
+
+    async def main():
+        try:
+            return await scenario()
+        finally:
+            await client.aclose()
+
+    return asyncio.run(main())
+
+
+def test_concurrent_lookups_share_one_upstream_call(transport, monkeypatch):
+    monkeypatch.setattr(numbers_stub, "STUB_LATENCY", 0.05)
+    client = FactClient("http://stub/", transport=transport)
+    facts = run(client, lambda: asyncio.gather(*(client.get(7) for _ in range(20))))
+    assert facts == [numbers_stub.fact(7)] * 20
+    assert transport.calls == 1
+
+
+def test_stale_hit_returns_immediately_and_refreshes(transport, monkeypatch):
+    client = FactClient("http://stub/", transport=transport, cache_ttl=0, cache_stale_ttl=60)
+
+    async def scenario():
+        assert await client.get(7) == numbers_stub.fact(7)
+        monkeypatch.setattr(numbers_stub, "STUB_LATENCY", 0.2)
+        start = time.perf_counter()
+        assert await client.get(7) == numbers_stub.fact(7)
+        assert time.perf_counter() - start < 0.1
+        refresh = client._inflight[7]
+        await refresh
+        return refresh.result()
+
+    assert run(client, scenario) == numbers_stub.fact(7)
+    assert transport.calls == 2
+
+
+def test_cache_evicts_least_recently_used(transport):
+    client = FactClient("http://stub/", transport=transport, cache_size=2)
+
+    async def scenario():
+        for n in (1, 2, 1, 3):
+            await client.get(n)
+        assert len(client.cache) == 2
+        calls = transport.calls
+        await client.get(1)
+        assert transport.calls == calls
+        await client.get(2)
+        assert transport.calls == calls + 1
+
+    run(client, scenario)
+    assert transport.calls == 4
+
+
+def test_slow_upstream_misses_deadline(transport, monkeypatch):
+    monkeypatch.setattr(numbers_stub, "STUB_LATENCY", 0.5)
+    client = FactClient("http://stub/", transport=transport, timeout=0.05)
+    start = time.perf_counter()
+    assert run(client, lambda: client.get(7)) == NO_FACT
+    assert time.perf_counter() - start < 0.4
+
+
+def test_connection_error_returns_no_fact():
+    def refuse(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    client = FactClient("http://stub/", transport=httpx.MockTransport(refuse))
+    assert run(client, lambda: client.get(7)) == NO_FACT
+    assert len(client.cache) == 0
+
+
+def test_error_status_returns_no_fact():
+    client = FactClient("http://stub/", transport=httpx.MockTransport(lambda request: httpx.Response(503)))
+    assert run(client, lambda: client.get(7)) == NO_FACT
+
+
+def test_batch_lookups_use_range_queries_and_skip_the_cache(transport):
+    client = FactClient("http://stub/", transport=transport)
+    numbers = [*range(-5, 245), 10 ** 6, 10 ** 6 + 50]
+    facts = run(client, lambda: client.get_many(numbers))
+    assert facts == {n: numbers_stub.fact(n) for n in numbers}
+    assert transport.calls == 4
+    assert len(client.cache) == 0
+
+
+def test_batch_lookup_failures_leave_numbers_out():
+    client = FactClient("http://stub/", transport=httpx.MockTransport(lambda request: httpx.Response(503)))
+    assert run(client, lambda: client.get_many([1, 2, 3])) == {}
+
+
+def test_upstream_fetch_is_recorded_in_request_timings(transport, monkeypatch):
+    monkeypatch.setattr(numbers_stub, "STUB_LATENCY", 0.05)
+    client = FactClient("http://stub/", transport=transport)
+    timings = []
+
+    async def scenario():
+        metrics._request_timings.set(timings)
+        await client.get(7)
+
+    run(client, scenario)
+    [(stage, seconds)] = timings
+    assert stage == "upstream"
+    assert seconds >= 0.05
@@ -0,0 +1,81 @@
+import re
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+import pytest
+
+import metrics
+from metrics import REQUEST_SECONDS, Counter, Gauge, Histogram, TimingMiddleware, expose, record, timed
+
+
+@pytest.fixture
+def registered(monkeypatch):
+    """Metrics created by a test are dropped from the global registry afterwards."""
+    monkeypatch.setattr(metrics, "REGISTRY", list(metrics.REGISTRY))
+
+
+def test_histogram_buckets_are_inclusive_upper_bounds(registered):
+    h = Histogram("test_seconds", "Test histogram.", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        h.observe(value, "a")
+    assert h.expose() == [
+        "# HELP test_seconds Test histogram.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{stage="a",le="0.1"} 2',
+        'test_seconds_bucket{stage="a",le="1"} 3',
+        'test_seconds_bucket{stage="a",le="+Inf"} 4',
+        'test_seconds_sum{stage="a"} 5.65',
+        'test_seconds_count{stage="a"} 4',
+    ]
+
+
+def test_counter_and_gauge(registered):
+    c = Counter("test_total", "Test counter.", ("outcome",))
+    c.inc("ok")
+    c.inc("ok", amount=2)
+    c.inc("error")
+    assert (c.value("ok"), c.value("missing"), c.total()) == (3, 0, 4)
+    assert c.expose()[2:] == ['test_total{outcome="ok"} 3', 'test_total{outcome="error"} 1']
+
+    g = Gauge("test_entries", "Test gauge.", (), lambda: {(): 7})
+    assert g.expose() == ["# HELP test_entries Test gauge.", "# TYPE test_entries gauge", "test_entries 7"]
+
+
+def test_expose_includes_every_registered_metric(registered):
+    Counter("test_exposed_total", "Exposed.").inc()
+    text = expose()
+    assert text.endswith("\n")
+    assert "# TYPE test_exposed_total counter\ntest_exposed_total 1\n" in text
+    for name in ("classify_stage_duration_seconds", "upstream_requests_total", "fact_cache_hit_ratio"):
+        assert f"# TYPE {name} " in text
+
+
+def app(server_timing: bool):
+    app = FastAPI()
+    app.add_middleware(TimingMiddleware, server_timing=server_timing)
+
+    @app.get("/work", response_class=PlainTextResponse)
+    async def work():
+        with timed("work"):
+            pass
+        record("upstream", 0.0125)
+        return "ok"
+
+    return app
+
+
+def test_server_timing_header():
+    response = TestClient(app(server_timing=True)).get("/work")
+    assert re.fullmatch(r"work;dur=\d+\.\d{3}, upstream;dur=12\.500", response.headers["server-timing"])
+
+
+def test_server_timing_is_off_by_default():
+    assert "server-timing" not in TestClient(app(server_timing=False)).get("/work").headers
+
+
+def test_request_latency_is_recorded_per_route():
+    child = REQUEST_SECONDS.labels("/work", "200")
+    before = sum(child.counts)
+    TestClient(app(server_timing=False)).get("/work")
+    assert sum(child.counts) == before + 1
@@ -0,0 +1,49 @@
+import pytest
+
+from primality import MR_DETERMINISTIC_LIMIT, SIEVE_LIMIT, is_prime, is_probabilistic
+
+# Strong pseudoprimes to the first few prime bases: each one fools a
+# Miller-Rabin test with too short a base list.
+STRONG_PSEUDOPRIMES = (2047, 3215031751, 3825123056546413051, 318665857834031151167461)
+MERSENNE_PRIMES = tuple(2 ** p - 1 for p in (31, 61, 89, 107, 127, 521))
+
+
+def trial_division_is_prime(n: int) -> bool:
+    if n < 2:
+        return False
+    for i in range(2, int(n ** 0.5) + 1):
+        if n % i == 0:
+            return False
+    return True
+
+
+def test_matches_trial_division():
+    for n in range(-10, 100_000):
+        assert is_prime(n) == trial_division_is_prime(n), n
+
+
+def test_matches_trial_division_around_sieve_limit():
+    for n in range(SIEVE_LIMIT - 1000, SIEVE_LIMIT + 1000):
+        assert is_prime(n) == trial_division_is_prime(n), n
+
+
+@pytest.mark.parametrize("n", STRONG_PSEUDOPRIMES)
+def test_strong_pseudoprimes_are_composite(n):
+    assert not is_prime(n)
+
+
+@pytest.mark.parametrize("n", MERSENNE_PRIMES)
+def test_mersenne_primes(n):
+    assert is_prime(n)
+
+
+@pytest.mark.parametrize("p", (11, 23, 29, 37, 67))
+def test_composite_mersenne_numbers(p):
+    assert not is_prime(2 ** p - 1)
+
+
+def test_only_large_prime_answers_are_probabilistic():
+    assert is_probabilistic(2 ** 89 - 1, True)
+    assert not is_probabilistic(2 ** 61 - 1, True)
+    assert not is_probabilistic(MR_DETERMINISTIC_LIMIT + 1, False)
+    assert not is_probabilistic(2 ** 70, False)
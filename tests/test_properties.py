@@ -0,0 +1,87 @@
+import pytest
+
+from classify_pool import TIMEOUT
+from factorization import PERFECT_NUMBERS_BOUND
+from properties import (
+    CHEAP,
+    CHEAP_MAX_DIGITS,
+    EXPENSIVE,
+    REGISTRY,
+    budgets,
+    classifier,
+    evaluate,
+    expensive,
+    plan,
+    public_fields,
+)
+
+
+def test_public_fields_in_registration_order():
+    assert public_fields() == [
+        "is_prime",
+        "is_prime_probabilistic",
+        "is_perfect",
+        "properties",
+        "digit_sum",
+        "prime_factors",
+        "divisor_count",
+        "abundance",
+    ]
+
+
+def test_plan_adds_dependencies_before_dependents():
+    assert plan(["properties"]) == ["is_armstrong", "parity", "properties"]
+    assert plan(["abundance", "is_prime_probabilistic"]) == [
+        "is_prime",
+        "is_prime_probabilistic",
+        "divisor_info",
+        "abundance",
+    ]
+    order = plan(public_fields())
+    for name in order:
+        for dependency in REGISTRY[name].depends:
+            assert order.index(dependency) < order.index(name)
+
+
+def test_only_factorization_goes_to_the_pool():
+    names = plan(public_fields())
+    assert list(expensive(names)) == ["divisor_info"]
+    assert REGISTRY["is_prime"].cost == CHEAP
+    assert budgets(names) == {}
+
+
+def test_evaluate():
+    values = evaluate(28, plan(["is_perfect", "properties", "divisor_count"]))
+    assert values["is_perfect"] is True
+    assert values["properties"] == ["even"]
+    assert values["divisor_count"] == 6
+
+
+def test_timeout_propagates_to_dependents():
+    names = plan(["prime_factors", "abundance", "digit_sum"])
+    values = evaluate(10 ** 40 + 1, names, {"divisor_info": TIMEOUT})
+    assert values["prime_factors"] == values["abundance"] == TIMEOUT
+    assert values["digit_sum"] == 2
+
+
+def test_evaluated_results_are_reused():
+    values = evaluate(7, plan(["is_prime_probabilistic"]), {"is_prime": False})
+    assert values == {"is_prime": False, "is_prime_probabilistic": False}
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"cost": EXPENSIVE, "depends": ("is_prime",)},
+        {"depends": ("not_registered",)},
+        {"budget": 1.0},
+    ],
+)
+def test_invalid_registrations_are_rejected(kwargs):
+    with pytest.raises(ValueError):
+        classifier("bogus", **kwargs)(lambda n, **deps: None)
+    assert "bogus" not in REGISTRY
+
+
+def test_cheap_classifiers_stay_below_the_perfect_number_bound():
+    assert 10 ** CHEAP_MAX_DIGITS <= PERFECT_NUMBERS_BOUND